@@ -39,6 +39,7 @@ POSSIBLE_EFFECT_TAGS = [
 class Ability:
 
     ability_definitions = None
+    ability_powers = None
 
     def __init__(
         self,
@@ -69,6 +70,23 @@ class Ability:
                 "Error: unable to recognize ability '{}'".format(ability_name)
             )
 
+    @classmethod
+    def power_by_name(cls, ability_name):
+        """Return the power of an ability without creating the ability"""
+        if Ability.ability_powers is None:
+            if Ability.ability_definitions is None:
+                Ability.ability_definitions = get_ability_definitions()
+            Ability.ability_powers = {
+                name: definition.get('power', None) or 'average'
+                for name, definition in Ability.ability_definitions.items()
+            }
+        try:
+            return Ability.ability_powers[ability_name]
+        except KeyError:
+            raise Exception(
+                "Error: unable to recognize ability '{}'".format(ability_name)
+            )
+
     def __repr__(self):
         return "{}({}, {}, {})".format(
             self.__class__.__name__,
@@ -91,10 +109,31 @@ class AbilityEffect:
                 )
         self.effect_tags = effect_tags
         self.effect = effect
+        # set by get_ability_definitions to the ability that defines this
+        # effect and the effect's index in that ability's effects
+        self.ability_name = None
+        self.index = None
 
     def __call__(self, creature):
         return self.effect(creature)
 
+    def signature(self):
+        """Identify this effect as plain data from its definition: the
+        ability that defines it, its position in that ability, and its tags.
+        The signature is the same in every run and on every Python version.
+        It does not change when an effect's function is edited, so increase
+        result_cache.ENGINE_VERSION when that changes combat.
+
+        Yields:
+            list
+        """
+        return [
+            self.__class__.__name__,
+            self.ability_name,
+            self.index,
+            list(self.effect_tags),
+        ]
+
 
 class Modifier(AbilityEffect):
     def __call__(self, creature, value):
@@ -538,4 +577,8 @@ def get_ability_definitions():
     all_abilities.update(misc)
     all_abilities.update(templates)
     all_abilities.update(traits)
+    for name, definition in all_abilities.items():
+        for index, effect in enumerate(definition.get('effects', list())):
+            effect.ability_name = name
+            effect.index = index
     return all_abilities
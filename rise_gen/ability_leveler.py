@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 from docopt import docopt
+from multiprocessing import Pool
+import traceback
+import rise_gen.level_cache as level_cache
 from rise_gen.leveler import Leveler
 import rise_gen.util as util
 
@@ -14,8 +17,13 @@ Usage:
 
 Options:
     -a, --ability <ability>  Only show information for the given ability
+    -c, --cache <file>       Only re-level abilities that changed since they
+                             were cached in this file, and show level changes
     -h, --help               Show this screen and exit
+    -i, --interval <sec>     Seconds between checks in watch mode [default: 1]
     -v, --verbose            Show more output
+    -w, --workers <count>    Level abilities across this many processes
+    --watch                  Re-level changed abilities whenever the file changes
 """
 
 RAW_MODIFIERS = util.import_yaml_file('content/ability_modifiers.yaml')
@@ -133,10 +141,10 @@ class AbilityLeveler(Leveler):
         # also check that each subability is individually positive
         if self.subeffects is not None:
             for subeffect_properties in filter(None, self.subeffects):
-                subability = self.create_nested(subeffect_properties)
-                if subability.level() <= 0:
+                sublevel = self.nested_level(subeffect_properties)
+                if sublevel <= 0:
                     self.warn("has nonpositive subeffect with level {}".format(
-                        subability.level()
+                        sublevel
                     ))
         # attack subeffects are also handled better below
         # this won't catch errors such as 'success' being < 3
@@ -144,11 +152,11 @@ class AbilityLeveler(Leveler):
             for property_name in ['critical success', 'effect', 'failure',
                                   'noncritical effect', 'success']:
                 if self.attack_subeffects.get(property_name) is not None:
-                    subability = self.create_nested(self.attack_subeffects[property_name])
-                    if subability.level() <= 0:
+                    sublevel = self.nested_level(self.attack_subeffects[property_name])
+                    if sublevel <= 0:
                         self.warn("has nonpositive attack subeffect '{}' with level {}".format(
                             property_name,
-                            subability.level()
+                            sublevel
                         ))
 
         # abilities with a duration must have something to apply
@@ -261,10 +269,11 @@ class AbilityLeveler(Leveler):
                 and self.area_type == 'zone'):
             self.warn("should not have duration 'brief' with area type 'zone'")
 
-    def level(self, ability_type=None):
+    def level(self, ability_type=None, breakdown=False):
         """Return the level of this ability.
         This calls all calculation functions relevant to the ability's properties.
-        If ability_type is not None, modify the level to its in-game value for the given type"""
+        If ability_type is not None, modify the level to its in-game value for the given type.
+        If breakdown is true, return a LevelBreakdown instead"""
         try:
             level_modifier = {
                 'class feature': -4,
@@ -275,6 +284,11 @@ class AbilityLeveler(Leveler):
         except KeyError:
             raise Exception("Unrecognized ability type '{}'".format(ability_type))
 
+        if breakdown:
+            result = super().level(breakdown=True)
+            if ability_type is not None:
+                result.add('ability type', level_modifier)
+            return result
         return super().level() + level_modifier
 
     def _area_modifier(self):
@@ -330,10 +344,9 @@ class AbilityLeveler(Leveler):
         for modifier_name in ['critical success', 'effect', 'failure',
                               'noncritical effect', 'success']:
             if self.attack_subeffects.get(modifier_name) is not None:
-                subability = self.create_nested(
+                sublevels[modifier_name] = self.nested_level(
                     self.attack_subeffects[modifier_name]
                 )
-                sublevels[modifier_name] = subability.level()
 
         # adjust the sublevels to include shared effects
         if 'effect' in sublevels:
@@ -481,8 +494,7 @@ class AbilityLeveler(Leveler):
     def _subeffects_modifier(self):
         modifier = 0
         for subeffect_properties in self.subeffects:
-            subability = self.create_nested(subeffect_properties)
-            modifier += subability.level()
+            modifier += self.nested_level(subeffect_properties)
         return modifier
 
     def _targets_modifier(self):
@@ -523,31 +535,143 @@ class AbilityLeveler(Leveler):
         return modifier
 AbilityLeveler.import_config('content/ability_leveler_config.yaml')
 
-def calculate_ability_levels(abilities, ability_type):
-    levels = dict()
-    for name in abilities:
-        ability = AbilityLeveler(name, abilities[name])
+def level_ability(ability_args):
+    """Validate and level a single ability, returning its warnings as data
+    instead of printing them
+
+    Args:
+        ability_args (tuple): (name, properties, ability_type)
+
+    Yields:
+        dict: {'name', 'level', 'warnings', 'error', 'error type', 'traceback'}
+    """
+    name, properties, ability_type = ability_args
+    result = {
+        'name': name,
+        'level': None,
+        'warnings': list(),
+        'error': None,
+        'error type': None,
+        'traceback': None,
+    }
+    try:
+        ability = AbilityLeveler(name, properties)
+        ability.print_warnings = False
+        result['warnings'] = ability.warnings
         ability.validate()
-        levels[name] = ability.level(ability_type)
+        result['level'] = ability.level(ability_type)
+    except Exception as e:
+        # exceptions are reported as strings so that results from worker
+        # processes can always be pickled
+        result['error'] = str(e)
+        result['error type'] = type(e).__name__
+        result['traceback'] = traceback.format_exc()
+    return result
+
+def level_abilities(abilities, ability_type, workers=None):
+    """Validate and level every ability, optionally across a process pool.
+    Results are yielded in the same order as the abilities.
+
+    Args:
+        abilities (dict): {<name>: <properties>}
+        ability_type (str): type of ability, as in AbilityLeveler.level
+        workers (int): number of worker processes; None or 1 to run serially
+
+    Yields:
+        dict: results of level_ability
+    """
+    ability_args = [
+        (name, abilities[name], ability_type)
+        for name in abilities
+    ]
+    if workers is None or workers <= 1:
+        for ability_arg in ability_args:
+            yield level_ability(ability_arg)
+    else:
+        with Pool(workers) as pool:
+            chunksize = max(1, len(ability_args) // (workers * 4))
+            for result in pool.imap(level_ability, ability_args, chunksize):
+                yield result
+
+def calculate_ability_levels(abilities, ability_type, workers=None):
+    levels = dict()
+    for result in level_abilities(abilities, ability_type, workers):
+        for warning in result['warnings']:
+            print(warning)
+        if result['error'] is not None:
+            raise Exception("Error: failed to level ability '{0}': {1}: {2}\n{3}".format(
+                result['name'],
+                result['error type'],
+                result['error'],
+                result['traceback'],
+            ))
+        levels[result['name']] = result['level']
     return levels
 
+def incremental_ability_levels(file_name, ability_type, cache, workers=None):
+    """Re-level only the abilities in the given file whose resolved
+    definitions changed since they were last cached
+
+    Yields:
+        list: level diffs from level_cache.incremental_levels
+    """
+    def level_changed_abilities(changed_abilities):
+        levels = dict()
+        for result in level_abilities(changed_abilities, ability_type, workers):
+            for warning in result['warnings']:
+                print(warning)
+            if result['error'] is not None:
+                print("Error: {0}: {1}".format(result['error type'], result['error']))
+            else:
+                levels[result['name']] = result['level']
+        return levels
+
+    return level_cache.incremental_levels(
+        util.import_yaml_file(file_name),
+        cache,
+        level_changed_abilities,
+    )
+
 def main(args):
     if args['items']:
-        abilities = util.import_yaml_file('content/magic_items.yaml')
+        file_name = 'content/magic_items.yaml'
         ability_type = 'magic item'
     elif args['rituals']:
-        abilities = util.import_yaml_file('content/rituals.yaml')
+        file_name = 'content/rituals.yaml'
         ability_type = 'spell'
     elif args['spells']:
-        abilities = util.import_yaml_file('content/spells.yaml')
+        file_name = 'content/spells.yaml'
         ability_type = 'spell'
     elif args['class']:
-        abilities = util.import_yaml_file('content/class_features.yaml')
+        file_name = 'content/class_features.yaml'
         ability_type = 'class feature'
     else:
         raise Exception("I don't know what ability data to use")
 
-    ability_levels = calculate_ability_levels(abilities, ability_type)
+    workers = int(args['--workers']) if args['--workers'] else None
+
+    if args['--cache'] or args['--watch']:
+        cache = level_cache.LevelCache(args['--cache'], context={
+            'ability type': ability_type,
+            'modifiers': RAW_MODIFIERS,
+        })
+
+        def update():
+            level_cache.print_level_diffs(
+                incremental_ability_levels(file_name, ability_type, cache, workers)
+            )
+
+        if args['--watch']:
+            try:
+                level_cache.watch([file_name], update, float(args['--interval']))
+            except KeyboardInterrupt:
+                pass
+        else:
+            update()
+        return
+
+    abilities = util.import_yaml_file(file_name)
+    ability_levels = calculate_ability_levels(abilities, ability_type, workers)
     for ability_name in sorted(ability_levels.keys()):
         print("{}: {}".format(
             ability_name,
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+import argparse
+from multiprocessing import Pool
+import random
+from pprint import pprint
+from functools import reduce
+from rise_gen.combat import (
+    CreatureGroup, _initialize_combat_worker, add_combat_totals, split_trials,
+    summarize_combat_totals
+)
+from rise_gen.creature import Creature
+from rise_gen.damage_model import attack_profile, strike_outcomes
+import rise_gen.distribution as distribution
+
+# samplers are shared between every army that has the same attackers and targets
+_attack_samplers = dict()
+
+
+class AttackSampler(object):
+    """Samples the damage an attacker deals to a target with a given defense,
+    using the outcomes from damage_model.strike_outcomes.
+
+    Physical attacks deal damage twice per hit (see Creature.strike), so each
+    hit is split into a first and second damage roll. When no damage roll can
+    be negative, damage reduction only depends on the total damage dealt in
+    a round, so the whole standard attack is sampled with a single draw.
+    """
+
+    def __init__(self, profile, defense):
+        attack_type, attack_count = profile[0], profile[2]
+        (miss_chance, miss_pmfs), (hit_chance, hit_pmfs), (critical_chance, critical_pmfs) = (
+            strike_outcomes(profile, defense)
+        )
+        self.attack_type = attack_type
+
+        if attack_type == 'physical':
+            damage_pmf, second_hit_pmf = hit_pmfs
+            second_critical_pmf = critical_pmfs[1]
+            self.attack_count = attack_count
+            self.miss_chance = miss_chance
+            self.critical_chance = critical_chance
+            self.first_damage = distribution.Sampler(damage_pmf)
+            self.second_hit_damage = distribution.Sampler(second_hit_pmf)
+            self.second_critical_damage = distribution.Sampler(second_critical_pmf)
+
+            self.combined = min(damage_pmf) >= 0 and min(second_hit_pmf) >= 0
+            if self.combined:
+                strike_pmf = distribution.mixture([
+                    (miss_chance, {0: 1.0}),
+                    (hit_chance, distribution.convolve(damage_pmf, second_hit_pmf)),
+                    (critical_chance, distribution.convolve(damage_pmf, second_critical_pmf)),
+                ])
+                self.standard_attack_damage = distribution.Sampler(
+                    distribution.convolve_power(strike_pmf, attack_count)
+                )
+        else:
+            # spells deal their damage at once, so they can always be combined
+            self.combined = True
+            self.standard_attack_damage = distribution.Sampler(distribution.mixture([
+                (miss_chance, miss_pmfs[0]),
+                (hit_chance, hit_pmfs[0]),
+                (critical_chance, critical_pmfs[0]),
+            ]))
+
+    @classmethod
+    def for_attack(cls, profile, defense):
+        key = (profile, defense)
+        try:
+            return _attack_samplers[key]
+        except KeyError:
+            return _attack_samplers.setdefault(key, cls(profile, defense))
+
+
+class Army(object):
+    """A CreatureGroup stored as parallel arrays of combat statistics.
+    The creatures are only read once, when the army is created.
+    """
+
+    def __init__(self, group):
+        creatures = group.creatures
+        for creature in creatures:
+            if creature.end_of_round_effects:
+                raise Exception(
+                    "Error: creature '{0}' has end of round effects, which armies do not support".format(
+                        creature.name
+                    )
+                )
+        self.size = len(creatures)
+        self.hit_points = [c.hit_points for c in creatures]
+        self.damage_reduction = [c.damage_reduction for c in creatures]
+        self.armor_defense = [c.armor_defense for c in creatures]
+        self.spell_defense = [min(c.fortitude, c.mental, c.reflex) for c in creatures]
+        self.attack_profiles = [attack_profile(c) for c in creatures]
+        self.refresh_combat()
+
+    def refresh_combat(self):
+        self.current_hit_points = list(self.hit_points)
+        self.zero_threshold = [True] * self.size
+        self.available_damage_reduction = list(self.damage_reduction)
+        self.damage_taken_this_round = [0] * self.size
+        self.living_index = 0
+
+    def refresh_round(self):
+        """Apply the same end of round logic as Creature.refresh_round"""
+        current_hit_points = self.current_hit_points
+        zero_threshold = self.zero_threshold
+        damage_taken_this_round = self.damage_taken_this_round
+        for i in range(self.size):
+            if current_hit_points[i] <= 0:
+                if (zero_threshold[i]
+                        and not damage_taken_this_round[i] > self.hit_points[i]):
+                    current_hit_points[i] = 0
+                zero_threshold[i] = False
+            else:
+                zero_threshold[i] = True
+            damage_taken_this_round[i] = 0
+        self.available_damage_reduction[:] = self.damage_reduction
+        self.living_index = 0
+
+    def get_living_index(self):
+        """Return the index of the first living creature, or None"""
+        current_hit_points = self.current_hit_points
+        i = self.living_index
+        while i < self.size:
+            if current_hit_points[i] >= 0:
+                self.living_index = i
+                return i
+            i += 1
+        self.living_index = i
+        return None
+
+    def is_alive(self):
+        return self.get_living_index() is not None
+
+    def take_damage(self, i, damage):
+        """Apply damage to a single creature like Creature.take_damage"""
+        available_damage_reduction = self.available_damage_reduction[i]
+        if available_damage_reduction > 0:
+            reduced_damage = max(0, damage - available_damage_reduction)
+            self.available_damage_reduction[i] -= (damage - reduced_damage)
+            damage = reduced_damage
+        self.current_hit_points[i] -= damage
+        self.damage_taken_this_round[i] += damage
+
+    def standard_attack(self, army):
+        """Every creature in this army makes a standard attack against the
+        first living creature in the given army, like CreatureGroup.standard_attack"""
+        for profile in self.attack_profiles:
+            target = army.get_living_index()
+            if target is None:
+                return
+            if profile[0] == 'physical':
+                sampler = AttackSampler.for_attack(profile, army.armor_defense[target])
+            else:
+                sampler = AttackSampler.for_attack(profile, army.spell_defense[target])
+
+            if sampler.combined:
+                army.take_damage(target, sampler.standard_attack_damage.sample())
+            else:
+                for strike in range(sampler.attack_count):
+                    chance = random.random()
+                    if chance < sampler.miss_chance:
+                        continue
+                    army.take_damage(target, sampler.first_damage.sample())
+                    if chance < sampler.miss_chance + sampler.critical_chance:
+                        army.take_damage(target, sampler.second_critical_damage.sample())
+                    else:
+                        army.take_damage(target, sampler.second_hit_damage.sample())
+
+
+def run_army_combat(red, blue):
+    """Simulate a combat between two armies, with the same rules as run_combat
+
+    Args:
+        red (Army): an army that attacks first
+        blue (Army): an army that attacks second
+    """
+
+    rounds = 0
+    while red.is_alive() and blue.is_alive() and rounds <= 100:
+        red.standard_attack(blue)
+        blue.standard_attack(red)
+        red.refresh_round()
+        blue.refresh_round()
+        rounds += 1
+
+    results = {
+        'red is alive': 1 if red.is_alive() else 0,
+        'blue is alive': 1 if blue.is_alive() else 0,
+        'rounds': rounds,
+    }
+
+    red.refresh_combat()
+    blue.refresh_combat()
+    return results
+
+
+# armies used by worker processes; set before the pool is created
+_worker_armies = None
+
+
+def simulate_army_combat(red, blue, trials):
+    """Run many army combats and add up their results, like combat.simulate_combat"""
+    totals = {
+        'trials': trials,
+        'red is alive': 0,
+        'blue is alive': 0,
+        'rounds': 0,
+    }
+    for t in range(trials):
+        result = run_army_combat(red, blue)
+        totals['red is alive'] += result['red is alive']
+        totals['blue is alive'] += result['blue is alive']
+        totals['rounds'] += result['rounds']
+    return totals
+
+
+def _simulate_army_chunk(chunk):
+    start, trials = chunk
+    red, blue = _worker_armies
+    return simulate_army_combat(red, blue, trials)
+
+
+def generate_army_combat_results(red, blue, trials, workers=None):
+    """Run many combats between two CreatureGroups using armies
+
+    Args:
+        red (CreatureGroup): creatures that attack first
+        blue (CreatureGroup): creatures that attack second
+        trials (int): number of combats to run
+        workers (int): number of worker processes; None or 1 to run serially
+
+    Yields:
+        dict: the same results as combat.generate_combat_results
+    """
+    global _worker_armies
+    red_army = Army(red)
+    blue_army = Army(blue)
+
+    if workers is None or workers <= 1:
+        totals = simulate_army_combat(red_army, blue_army, trials)
+    else:
+        _worker_armies = (red_army, blue_army)
+        try:
+            with Pool(workers, initializer=_initialize_combat_worker) as pool:
+                totals = reduce(add_combat_totals, pool.map(_simulate_army_chunk, split_trials(trials)))
+        finally:
+            _worker_armies = None
+
+    return summarize_combat_totals(totals)
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Do battle between armies of Rise creatures',
+    )
+    parser.add_argument(
+        '-b', '--blue',
+        dest='blue',
+        help='creatures on the blue side; use <name>:<count> for many copies',
+        type=str,
+        nargs='+',
+    )
+    parser.add_argument(
+        '-l', '--level',
+        dest='level',
+        help='the level of the characters',
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        '-r', '--red',
+        dest='red',
+        help='creatures on the red side; use <name>:<count> for many copies',
+        type=str,
+        nargs='+',
+    )
+    parser.add_argument(
+        '--trials',
+        default=1000,
+        dest='trials',
+        help='The number of trials to run',
+        type=int,
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        help='the number of worker processes to use',
+        type=int,
+    )
+    return vars(parser.parse_args())
+
+
+def build_creatures(names, level):
+    """Build creatures from names like 'fighter' or 'fighter:200'.
+    Armies only read a creature's statistics, so copies share one creature."""
+    creatures = list()
+    for name in names:
+        name, separator, count = name.partition(':')
+        creatures += [Creature.from_sample_creature(name, level=level)] * int(count or 1)
+    return creatures
+
+
+def main(args):
+    red = CreatureGroup(build_creatures(args['red'], args['level']))
+    blue = CreatureGroup(build_creatures(args['blue'], args['level']))
+    pprint(generate_army_combat_results(red, blue, args['trials'], args['workers']))
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
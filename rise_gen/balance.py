@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+
+import argparse
+import math
+from multiprocessing import Pool
+from pprint import pprint
+from rise_gen.combat import (
+    TRIAL_CHUNK_SIZE, CreatureGroup, _initialize_combat_worker,
+    add_combat_totals, create_combat_pool, sample_group, simulate_combat_chunk,
+    split_trials
+)
+from rise_gen.creature import Creature
+
+# z score of the confidence interval used to decide whether a win rate is
+# clearly above or below the target
+CONFIDENCE_Z = 1.96
+
+# statistics perturbed by a sensitivity analysis unless others are given
+SENSITIVITY_STATISTICS = """
+    accuracy
+    armor_defense
+    damage_bonus
+    hit_points
+    fortitude
+    reflex
+    mental
+    damage_reduction
+""".split()
+
+
+def _simulate_level_chunk(chunk_args):
+    red_names, red_level, blue_names, blue_level, start, trials, seed = chunk_args
+    return simulate_combat_chunk(
+        sample_group(red_names, red_level, 'red'),
+        sample_group(blue_names, blue_level, 'blue'),
+        start,
+        trials,
+        seed,
+    )
+
+
+class MatchupEvaluator(object):
+    """Estimates red's win rate in a matchup as one side's level changes.
+
+    Trials are seeded by chunk, so every level is simulated with the same
+    random numbers, which makes differences between levels less noisy.
+    Trials run at a level are kept, so asking about a level again only runs
+    the extra trials that are needed.
+
+    With workers, several levels are simulated at once on a process pool
+    that is kept until close() is called.
+    """
+
+    def __init__(self, red_names, blue_names, level, vary='red', seed=0, workers=None):
+        """
+        Args:
+            red_names (list): names of sample creatures on the red side
+            blue_names (list): names of sample creatures on the blue side
+            level (int): level of the side that does not vary
+            vary (str): 'red' or 'blue', the side whose level changes
+            seed (varies): seed for the trials
+            workers (int): number of worker processes; None or 1 to run serially
+        """
+        if vary not in ['red', 'blue']:
+            raise Exception("Error: invalid side '{0}'".format(vary))
+        self.red_names = tuple(red_names)
+        self.blue_names = tuple(blue_names)
+        self.level = level
+        self.vary = vary
+        self.seed = seed
+        self.workers = workers
+        self.pool = None
+        # {<level>: totals, as from simulate_combat}
+        self.totals = dict()
+
+    def is_parallel(self):
+        return self.workers is not None and self.workers > 1
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = create_combat_pool(self.workers)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def trials(self, level):
+        return self.totals[level]['trials'] if level in self.totals else 0
+
+    def total_trials(self):
+        return sum(totals['trials'] for totals in self.totals.values())
+
+    def _next_chunk(self, level):
+        if self.vary == 'red':
+            red_level, blue_level = level, self.level
+        else:
+            red_level, blue_level = self.level, level
+        return (
+            self.red_names, red_level, self.blue_names, blue_level,
+            self.trials(level), TRIAL_CHUNK_SIZE, self.seed,
+        )
+
+    def win_rate(self, level):
+        totals = self.totals[level]
+        return totals['red is alive'] / float(totals['trials'])
+
+    def is_decided(self, level, target, max_trials):
+        """Check whether red's win rate at a level is clearly above or below
+        the target, or max_trials have already been run"""
+        trials = self.trials(level)
+        if trials == 0:
+            return False
+        if trials >= max_trials:
+            return True
+        win_rate = self.win_rate(level)
+        standard_error = math.sqrt(max(win_rate * (1 - win_rate), 0.01) / trials)
+        return abs(win_rate - target) > CONFIDENCE_Z * standard_error
+
+    def compare_levels(self, levels, target, max_trials):
+        """Run trials at each level until red's win rate is clearly above or
+        below the target, or until max_trials have been run. Every undecided
+        level runs one chunk at a time, so with workers the levels are
+        simulated in parallel without running more trials than needed.
+
+        Yields:
+            dict: {<level>: True if the win rate is at least the target}
+        """
+        while True:
+            undecided = [
+                level for level in levels
+                if not self.is_decided(level, target, max_trials)
+            ]
+            if not undecided:
+                break
+            chunks = [self._next_chunk(level) for level in undecided]
+            if self.is_parallel():
+                chunk_totals = self.get_pool().map(_simulate_level_chunk, chunks)
+            else:
+                chunk_totals = map(_simulate_level_chunk, chunks)
+            for level, totals in zip(undecided, chunk_totals):
+                if level in self.totals:
+                    self.totals[level] = add_combat_totals(self.totals[level], totals)
+                else:
+                    self.totals[level] = totals
+        return {level: self.win_rate(level) >= target for level in levels}
+
+    def compare(self, level, target, max_trials):
+        """Run trials at a level as in compare_levels
+
+        Yields:
+            bool: True if the win rate is at least the target
+        """
+        return self.compare_levels([level], target, max_trials)[level]
+
+
+def search_level(evaluator, target=0.5, min_level=1, max_level=20, max_trials=20000):
+    """Find the level of the varying side at which red's win rate crosses the target.
+    Win rates are assumed to change monotonically with level, so the level
+    is found by bisection. If the evaluator has workers, each step splits
+    the remaining range at one level per worker and simulates those levels
+    at the same time.
+
+    Args:
+        evaluator (MatchupEvaluator)
+        target (float): red's target win rate, from 0 to 1
+        min_level (int): lowest level to consider
+        max_level (int): highest level to consider
+        max_trials (int): most trials to run at a single level
+
+    Yields:
+        dict: {
+            'level': the first level past the crossing, or None if the
+                win rate does not cross the target between min_level and max_level,
+            'interpolated level': fractional level where the win rate is
+                estimated to equal the target,
+            'level offset': difference between the interpolated level and
+                the level of the side that does not vary,
+            'win rates': {<level>: <red's win rate>} for every level simulated,
+            'trials': total number of trials run,
+        }
+    """
+    def crossed_levels(levels):
+        # red wins more as red levels up, and less as blue levels up
+        reaches_target = evaluator.compare_levels(levels, target, max_trials)
+        return {
+            level: reaches_target[level] if evaluator.vary == 'red' else not reaches_target[level]
+            for level in levels
+        }
+
+    splits = evaluator.workers if evaluator.is_parallel() else 1
+    if splits > 1:
+        # both ends are usually needed, so simulate them together
+        crossed_levels([min_level, max_level])
+    if crossed_levels([min_level])[min_level]:
+        level = min_level
+    elif not crossed_levels([max_level])[max_level]:
+        level = None
+    else:
+        low, high = min_level, max_level
+        while high - low > 1:
+            candidates = sorted(set(
+                low + (high - low) * i // (splits + 1)
+                for i in range(1, splits + 1)
+            ) - set([low, high]))
+            crossed = crossed_levels(candidates)
+            for candidate in candidates:
+                if crossed[candidate]:
+                    high = candidate
+                    break
+                low = candidate
+        level = high
+
+    interpolated_level = None
+    if level is not None:
+        interpolated_level = float(level)
+        if level - 1 in evaluator.totals:
+            before = evaluator.win_rate(level - 1)
+            after = evaluator.win_rate(level)
+            if after != before:
+                interpolated_level = level - 1 + (target - before) / (after - before)
+
+    return {
+        'level': level,
+        'interpolated level': interpolated_level,
+        'level offset': (
+            interpolated_level - evaluator.level
+            if interpolated_level is not None else None
+        ),
+        'win rates': {
+            level: round(evaluator.win_rate(level), 3)
+            for level in sorted(evaluator.totals)
+        },
+        'trials': evaluator.total_trials(),
+    }
+
+
+# matchups used by worker processes; set before the pool is created
+# since creatures hold lambdas and cannot be pickled
+_worker_matchups = None
+
+def _simulate_matchup_chunk(chunk_args):
+    index, start, trials, seed = chunk_args
+    red, blue = _worker_matchups[index]
+    return simulate_combat_chunk(red, blue, start, trials, seed)
+
+def simulate_matchups(matchups, trials, workers=None, seed=0):
+    """Run the same seeded trials for each of several matchups.
+    Every matchup sees the same random numbers, so differences between
+    matchups are not hidden by noise from different dice rolls.
+
+    If a creature is on both sides of a matchup, such as when red and blue
+    are the same group, blue is copied so that no creature fights itself.
+
+    Args:
+        matchups (list): [(<red CreatureGroup>, <blue CreatureGroup>), ...]
+        trials (int): number of combats to run for each matchup
+        workers (int): number of worker processes; None or 1 to run serially
+        seed (varies): seed for the trials
+
+    Yields:
+        list: totals for each matchup, as from simulate_combat
+    """
+    global _worker_matchups
+    # matchups whose creatures fight identically get identical results,
+    # so each is only simulated once
+    unique_matchups = list()
+    unique_indices = dict()
+    matchup_indices = list()
+    for red, blue in matchups:
+        if set(map(id, red.creatures)).intersection(map(id, blue.creatures)):
+            blue = blue.copy()
+        key = (red.fingerprint(), blue.fingerprint())
+        if key not in unique_indices:
+            unique_indices[key] = len(unique_matchups)
+            unique_matchups.append((red, blue))
+        matchup_indices.append(unique_indices[key])
+
+    chunk_args = [
+        (index, start, chunk_trials, seed)
+        for index in range(len(unique_matchups))
+        for start, chunk_trials in split_trials(trials)
+    ]
+    _worker_matchups = unique_matchups
+    try:
+        if workers is None or workers <= 1:
+            chunk_totals = list(map(_simulate_matchup_chunk, chunk_args))
+        else:
+            with Pool(workers, initializer=_initialize_combat_worker) as pool:
+                chunk_totals = pool.map(_simulate_matchup_chunk, chunk_args)
+    finally:
+        _worker_matchups = None
+
+    totals = [None] * len(unique_matchups)
+    for (index, _, _, _), chunk in zip(chunk_args, chunk_totals):
+        totals[index] = chunk if totals[index] is None else add_combat_totals(totals[index], chunk)
+    return [totals[index] for index in matchup_indices]
+
+def win_rate(totals):
+    """Return red's win rate from totals, as from simulate_combat"""
+    return totals['red is alive'] / float(totals['trials'])
+
+def perturbed_group(group, statistic, delta):
+    """Return a copy of a CreatureGroup with one calculated statistic of
+    every creature changed by delta. Nothing else is recalculated, so
+    statistics that would normally depend on the changed statistic keep
+    their original values.
+
+    Args:
+        group (CreatureGroup)
+        statistic (str): name of a cached numerical statistic, such as 'accuracy'
+        delta (int): amount to add to the statistic
+
+    Yields:
+        CreatureGroup
+    """
+    if statistic not in Creature.cached_property_names:
+        raise Exception("Error: unknown statistic '{0}'".format(statistic))
+    creatures = list()
+    for creature in group.creatures:
+        value = getattr(creature, statistic)
+        if not isinstance(value, int):
+            raise Exception("Error: statistic '{0}' is not a number".format(statistic))
+        perturbed_creature = creature.copy()
+        perturbed_creature.cache(statistic, value + delta)
+        perturbed_creature.refresh_combat()
+        creatures.append(perturbed_creature)
+    return CreatureGroup(creatures)
+
+def stat_sensitivity(red, blue, statistics=None, side='red', delta=1,
+                     trials=2000, workers=None, seed=0):
+    """Estimate how much red's win rate changes per point of each statistic.
+    Each statistic is raised and lowered by delta on one side, and the
+    gradient is the central difference of red's win rates.
+
+    Args:
+        red (CreatureGroup): creatures that attack first
+        blue (CreatureGroup): creatures that attack second
+        statistics (list): names of statistics to perturb.
+            Defaults to SENSITIVITY_STATISTICS.
+        side (str): 'red' or 'blue', the side whose statistics are perturbed
+        delta (int): amount to raise and lower each statistic by
+        trials (int): number of combats to run for each perturbation
+        workers (int): number of worker processes; None or 1 to run serially
+        seed (varies): seed shared by every perturbation
+
+    Yields:
+        dict: {
+            'win rate': red's win rate without perturbations,
+            'statistics': [{'statistic', 'win rate -', 'win rate +', 'gradient'}, ...]
+                ordered from the largest effect to the smallest,
+        }
+    """
+    if side not in ['red', 'blue']:
+        raise Exception("Error: invalid side '{0}'".format(side))
+    statistics = statistics or SENSITIVITY_STATISTICS
+    matchups = [(red, blue)]
+    for statistic in statistics:
+        for sign in [-1, 1]:
+            if side == 'red':
+                matchups.append((perturbed_group(red, statistic, sign * delta), blue))
+            else:
+                matchups.append((red, perturbed_group(blue, statistic, sign * delta)))
+
+    win_rates = [win_rate(totals) for totals in simulate_matchups(matchups, trials, workers, seed)]
+    rows = list()
+    for i, statistic in enumerate(statistics):
+        lowered, raised = win_rates[2 * i + 1], win_rates[2 * i + 2]
+        rows.append({
+            'statistic': statistic,
+            'win rate -': lowered,
+            'win rate +': raised,
+            'gradient': (raised - lowered) / (2.0 * delta),
+        })
+    return {
+        'win rate': win_rates[0],
+        'statistics': sorted(rows, key=lambda row: abs(row['gradient']), reverse=True),
+    }
+
+def ablated_group(group, ability_name):
+    """Return a copy of a CreatureGroup with an ability removed from every
+    creature that has it. Creatures without the ability are shared with
+    the original group rather than copied.
+
+    Args:
+        group (CreatureGroup)
+        ability_name (str): name of the ability to remove
+
+    Yields:
+        CreatureGroup
+    """
+    creatures = list()
+    for creature in group.creatures:
+        abilities = [
+            ability for ability in creature.abilities
+            if ability.name != ability_name
+        ]
+        if len(abilities) == len(creature.abilities):
+            creatures.append(creature)
+            continue
+        ablated_creature = creature.copy()
+        ablated_creature.abilities = abilities
+        # statistics may depend on the removed ability
+        ablated_creature.clear_cache()
+        ablated_creature.refresh_combat()
+        creatures.append(ablated_creature)
+    if all(a is b for a, b in zip(creatures, group.creatures)):
+        raise Exception("Error: no creature has the ability '{0}'".format(ability_name))
+    return CreatureGroup(creatures)
+
+def ability_ablation(red, blue, ability_names=None, side='red',
+                     trials=2000, workers=None, seed=0):
+    """Estimate how much each ability contributes to one side's win rate
+    by removing the abilities one at a time.
+
+    Args:
+        red (CreatureGroup): creatures that attack first
+        blue (CreatureGroup): creatures that attack second
+        ability_names (list): names of abilities to remove. Defaults to
+            every active ability on the side.
+        side (str): 'red' or 'blue', the side whose abilities are removed
+        trials (int): number of combats to run for each variant
+        workers (int): number of worker processes; None or 1 to run serially
+        seed (varies): seed shared by every variant
+
+    Yields:
+        dict: {
+            'win rate': the side's win rate with every ability,
+            'abilities': [{'ability', 'win rate without', 'contribution'}, ...]
+                ordered from the largest contribution to the smallest,
+        }
+    """
+    if side not in ['red', 'blue']:
+        raise Exception("Error: invalid side '{0}'".format(side))
+    group = red if side == 'red' else blue
+    if ability_names is None:
+        ability_names = sorted(set(
+            ability.name
+            for creature in group.creatures
+            for ability in creature.active_abilities
+        ))
+    matchups = [(red, blue)]
+    for ability_name in ability_names:
+        if side == 'red':
+            matchups.append((ablated_group(red, ability_name), blue))
+        else:
+            matchups.append((red, ablated_group(blue, ability_name)))
+
+    alive_key = '{0} is alive'.format(side)
+    win_rates = [
+        totals[alive_key] / float(totals['trials'])
+        for totals in simulate_matchups(matchups, trials, workers, seed)
+    ]
+    rows = [
+        {
+            'ability': ability_name,
+            'win rate without': win_rates[i + 1],
+            'contribution': win_rates[0] - win_rates[i + 1],
+        }
+        for i, ability_name in enumerate(ability_names)
+    ]
+    return {
+        'win rate': win_rates[0],
+        'abilities': sorted(rows, key=lambda row: row['contribution'], reverse=True),
+    }
+
+def format_table(rows, columns):
+    """Format a list of dicts as text, with one row per dict
+
+    Args:
+        rows (list): [{<column>: <value>}, ...]; floats are shown to three places
+        columns (list): names of the columns to show, in order
+    """
+    def format_value(value):
+        return '{0:.3f}'.format(value) if isinstance(value, float) else str(value)
+
+    text_rows = [list(columns)] + [
+        [format_value(row[column]) for column in columns]
+        for row in rows
+    ]
+    widths = [max(len(row[i]) for row in text_rows) for i in range(len(columns))]
+    return '\n'.join([
+        ' '.join(value.rjust(width) for value, width in zip(row, widths))
+        for row in text_rows
+    ])
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Analyze the balance of matchups between Rise creatures',
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    def add_matchup_arguments(subparser):
+        subparser.add_argument(
+            '-b', '--blue',
+            dest='blue',
+            help='creatures on the blue side',
+            nargs='+',
+            required=True,
+            type=str,
+        )
+        subparser.add_argument(
+            '-l', '--level',
+            default=1,
+            dest='level',
+            help='the level of the characters',
+            type=int,
+        )
+        subparser.add_argument(
+            '-r', '--red',
+            dest='red',
+            help='creatures on the red side',
+            nargs='+',
+            required=True,
+            type=str,
+        )
+        subparser.add_argument(
+            '--seed',
+            default=0,
+            dest='seed',
+            help='seed for the trials',
+            type=int,
+        )
+        subparser.add_argument(
+            '-w', '--workers',
+            dest='workers',
+            help='the number of worker processes to use',
+            type=int,
+        )
+
+    search_parser = subparsers.add_parser(
+        'search',
+        help="find the level at which red's win rate crosses a target",
+    )
+    add_matchup_arguments(search_parser)
+    search_parser.add_argument(
+        '--max-level',
+        default=20,
+        dest='max_level',
+        help='the highest level to consider',
+        type=int,
+    )
+    search_parser.add_argument(
+        '--max-trials',
+        default=20000,
+        dest='max_trials',
+        help='the most trials to run at a single level',
+        type=int,
+    )
+    search_parser.add_argument(
+        '--min-level',
+        default=1,
+        dest='min_level',
+        help='the lowest level to consider',
+        type=int,
+    )
+    search_parser.add_argument(
+        '--target',
+        default=0.5,
+        dest='target',
+        help="red's target win rate, from 0 to 1",
+        type=float,
+    )
+    search_parser.add_argument(
+        '--vary',
+        choices=['red', 'blue'],
+        default='red',
+        dest='vary',
+        help='the side whose level changes; the other side stays at --level',
+    )
+
+    sensitivity_parser = subparsers.add_parser(
+        'sensitivity',
+        help="rank statistics by how much they change red's win rate",
+    )
+    add_matchup_arguments(sensitivity_parser)
+    sensitivity_parser.add_argument(
+        '--delta',
+        default=1,
+        dest='delta',
+        help='the amount to raise and lower each statistic by',
+        type=int,
+    )
+    sensitivity_parser.add_argument(
+        '--side',
+        choices=['red', 'blue'],
+        default='red',
+        dest='side',
+        help='the side whose statistics are perturbed',
+    )
+    sensitivity_parser.add_argument(
+        '-s', '--statistics',
+        dest='statistics',
+        help='the statistics to perturb',
+        nargs='+',
+        type=str,
+    )
+    sensitivity_parser.add_argument(
+        '-t', '--trials',
+        default=2000,
+        dest='trials',
+        help='the number of trials to run for each perturbation',
+        type=int,
+    )
+
+    ablation_parser = subparsers.add_parser(
+        'ablation',
+        help='measure how much each ability contributes to a win rate',
+    )
+    add_matchup_arguments(ablation_parser)
+    ablation_parser.add_argument(
+        '-a', '--abilities',
+        dest='abilities',
+        help='the abilities to remove; defaults to every active ability',
+        nargs='+',
+        type=str,
+    )
+    ablation_parser.add_argument(
+        '--side',
+        choices=['red', 'blue'],
+        default='red',
+        dest='side',
+        help='the side whose abilities are removed',
+    )
+    ablation_parser.add_argument(
+        '-t', '--trials',
+        default=2000,
+        dest='trials',
+        help='the number of trials to run for each variant',
+        type=int,
+    )
+    return vars(parser.parse_args())
+
+
+def main(args):
+    if args['command'] == 'search':
+        evaluator = MatchupEvaluator(
+            args['red'],
+            args['blue'],
+            args['level'],
+            vary=args['vary'],
+            seed=args['seed'],
+            workers=args['workers'],
+        )
+        try:
+            pprint(search_level(
+                evaluator,
+                target=args['target'],
+                min_level=args['min_level'],
+                max_level=args['max_level'],
+                max_trials=args['max_trials'],
+            ))
+        finally:
+            evaluator.close()
+    elif args['command'] == 'sensitivity':
+        results = stat_sensitivity(
+            sample_group(args['red'], args['level'], 'red'),
+            sample_group(args['blue'], args['level'], 'blue'),
+            statistics=args['statistics'],
+            side=args['side'],
+            delta=args['delta'],
+            trials=args['trials'],
+            workers=args['workers'],
+            seed=args['seed'],
+        )
+        print('red win rate: {0:.3f}'.format(results['win rate']))
+        print(format_table(
+            results['statistics'],
+            ['statistic', 'win rate -', 'win rate +', 'gradient'],
+        ))
+    elif args['command'] == 'ablation':
+        results = ability_ablation(
+            sample_group(args['red'], args['level'], 'red'),
+            sample_group(args['blue'], args['level'], 'blue'),
+            ability_names=args['abilities'],
+            side=args['side'],
+            trials=args['trials'],
+            workers=args['workers'],
+            seed=args['seed'],
+        )
+        print('{0} win rate: {1:.3f}'.format(args['side'], results['win rate']))
+        print(format_table(
+            results['abilities'],
+            ['ability', 'win rate without', 'contribution'],
+        ))
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
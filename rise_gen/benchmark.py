@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+import argparse
+from contextlib import redirect_stdout
+import glob
+import io
+import json
+import platform
+import sys
+import time
+import timeit
+from rise_gen.ability_leveler import calculate_ability_levels
+from rise_gen.combat import CreatureGroup, generate_combat_results, run_combat
+from rise_gen.creature import Creature, STAT_BLOCK_STATISTICS
+from rise_gen.dice import Die
+from rise_gen.leveler import Leveler
+import rise_gen.util as util
+
+# sample creatures used by the property and combat benchmarks
+BENCHMARK_CREATURES = 'barbarian cleric_spells druid fighter ranger rogue sorcerer warrior'.split()
+BENCHMARK_LEVEL = 10
+WORKER_COUNTS = [1, 2, 4]
+
+
+def time_function(function, number, repeat=3):
+    """Return the best time per call of a function, in seconds.
+    The minimum of several repeats is the least noisy estimate.
+
+    Args:
+        function (function): called with no arguments
+        number (int): number of calls per repeat
+        repeat (int): number of repeats
+
+    Yields:
+        float
+    """
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def _sample_creatures():
+    return [Creature.from_sample_creature(name, level=BENCHMARK_LEVEL)
+            for name in BENCHMARK_CREATURES]
+
+
+def benchmark_die_roll():
+    die = Die(8, 2)
+    return {'die roll': time_function(die.roll, 100000)}
+
+
+def benchmark_creature_construction():
+    # loading the content is measured separately by the yaml benchmark
+    Creature.load_sample_creatures()
+
+    def construct():
+        for name in BENCHMARK_CREATURES:
+            Creature.from_sample_creature(name, level=BENCHMARK_LEVEL)
+    return {'creature construction': time_function(construct, 20) / len(BENCHMARK_CREATURES)}
+
+
+def benchmark_properties():
+    creatures = _sample_creatures()
+
+    def read_statistics():
+        for creature in creatures:
+            for statistic in STAT_BLOCK_STATISTICS:
+                getattr(creature, statistic)
+
+    def read_cold_statistics():
+        for creature in creatures:
+            creature.clear_cache()
+        read_statistics()
+
+    reads = len(creatures) * len(STAT_BLOCK_STATISTICS)
+    read_statistics()
+    return {
+        'cold properties': time_function(read_cold_statistics, 20) / reads,
+        'warm properties': time_function(read_statistics, 200) / reads,
+    }
+
+
+def _combatants():
+    creatures = _sample_creatures()
+    red = CreatureGroup(creatures[:len(creatures) // 2])
+    blue = CreatureGroup(creatures[len(creatures) // 2:])
+    return red, blue
+
+
+def benchmark_combat():
+    red, blue = _combatants()
+    return {'combat trial': time_function(lambda: run_combat(red, blue), 500)}
+
+
+def benchmark_spell_combat():
+    # high level spellcasters roll dozens of dice with every spell
+    red = Creature.from_sample_creature('sorcerer', level=20)
+    blue = Creature.from_sample_creature('warrior', level=20)
+    return {'spell combat trial': time_function(lambda: run_combat(red, blue), 500)}
+
+
+def benchmark_combat_workers():
+    red, blue = _combatants()
+    trials = 4000
+    results = dict()
+    for workers in WORKER_COUNTS:
+        results['combat trial ({0} workers)'.format(workers)] = time_function(
+            lambda: generate_combat_results(red, blue, trials, workers),
+            1,
+        ) / trials
+    return results
+
+
+def benchmark_import_yaml():
+    file_names = sorted(glob.glob('content/*.yaml'))
+
+    def import_content():
+        for file_name in file_names:
+            util.import_yaml_file(file_name)
+    return {'import content': time_function(import_content, 1)}
+
+
+def benchmark_ability_levels():
+    spells = util.import_yaml_file('content/spells.yaml')
+
+    def level_spells():
+        # nested levels are memoized across calls, so start from scratch
+        Leveler.clear_nested_levels()
+        calculate_ability_levels(spells, 'spell')
+
+    # levelling prints warnings, which would swamp the results
+    with redirect_stdout(io.StringIO()):
+        return {'spell levels': time_function(level_spells, 1)}
+
+
+BENCHMARKS = {
+    'dice': benchmark_die_roll,
+    'construction': benchmark_creature_construction,
+    'properties': benchmark_properties,
+    'combat': benchmark_combat,
+    'spells': benchmark_spell_combat,
+    'workers': benchmark_combat_workers,
+    'yaml': benchmark_import_yaml,
+    'abilities': benchmark_ability_levels,
+}
+
+
+def run_benchmarks(names=None):
+    """Run benchmarks and return their results
+
+    Args:
+        names (list): names of benchmarks in BENCHMARKS to run; None to run all
+
+    Yields:
+        dict: {'metadata': {...}, 'benchmarks': {<name>: <seconds per operation>}}
+    """
+    results = dict()
+    for name in names or BENCHMARKS.keys():
+        try:
+            benchmark = BENCHMARKS[name]
+        except KeyError:
+            raise Exception("Error: unknown benchmark '{0}'".format(name))
+        results.update(benchmark())
+    return {
+        'metadata': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare_benchmarks(baseline, current, threshold):
+    """Compare two sets of benchmark results
+
+    Args:
+        baseline (dict): results of run_benchmarks
+        current (dict): results of run_benchmarks
+        threshold (float): fraction that a benchmark may slow down by
+            before it counts as a regression
+
+    Yields:
+        list: [(<name>, <baseline seconds>, <current seconds>, <is regression>), ...]
+            for every benchmark in both sets of results
+    """
+    comparisons = list()
+    for name in sorted(baseline['benchmarks']):
+        if name not in current['benchmarks']:
+            continue
+        baseline_time = baseline['benchmarks'][name]
+        current_time = current['benchmarks'][name]
+        comparisons.append((
+            name,
+            baseline_time,
+            current_time,
+            current_time > baseline_time * (1 + threshold),
+        ))
+    return comparisons
+
+
+def format_benchmarks(results):
+    return '\n'.join(
+        '{0}: {1:.3g} s'.format(name, results['benchmarks'][name])
+        for name in sorted(results['benchmarks'])
+    )
+
+
+def format_comparisons(comparisons):
+    lines = list()
+    for name, baseline_time, current_time, is_regression in comparisons:
+        lines.append('{0}: {1:.3g} s -> {2:.3g} s ({3:+.1%}){4}'.format(
+            name,
+            baseline_time,
+            current_time,
+            current_time / baseline_time - 1,
+            ' REGRESSION' if is_regression else '',
+        ))
+    return '\n'.join(lines)
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark dice, creatures, combat, and levelling',
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument(
+        '-b', '--benchmarks',
+        choices=sorted(BENCHMARKS.keys()),
+        dest='benchmarks',
+        help='only run the given benchmarks',
+        nargs='+',
+    )
+    run_parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        help='JSON file to save the results in',
+        type=str,
+    )
+
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='compare saved results against a baseline',
+    )
+    compare_parser.add_argument('baseline', help='JSON file with baseline results')
+    compare_parser.add_argument('current', help='JSON file with current results')
+    compare_parser.add_argument(
+        '-t', '--threshold',
+        default=0.1,
+        dest='threshold',
+        help='fractional slowdown that counts as a regression',
+        type=float,
+    )
+    return vars(parser.parse_args())
+
+
+def main(args):
+    if args['command'] == 'run':
+        results = run_benchmarks(args['benchmarks'])
+        print(format_benchmarks(results))
+        if args['output']:
+            with open(args['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+    elif args['command'] == 'compare':
+        with open(args['baseline'], 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(args['current'], 'r') as current_file:
+            current = json.load(current_file)
+        comparisons = compare_benchmarks(baseline, current, args['threshold'])
+        print(format_comparisons(comparisons))
+        if any(comparison[3] for comparison in comparisons):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
@@ -1,16 +1,43 @@
 #!/usr/bin/env python3
 
 import argparse
-from rise_gen.creature import Creature
+from collections import defaultdict
+from functools import reduce
+import json
+from multiprocessing import Pool
+from rise_gen.creature import Creature, format_level_table
+from rise_gen.damage_model import combat_rounds_pmf, percentile
+import rise_gen.distribution as distribution
 import cProfile
+import rise_gen.instrumentation as instrumentation
+import rise_gen.profiling as profiling
+from rise_gen.result_cache import ResultCache
 from pprint import pprint
+import random
+import sys
+import rise_gen.tracing as tracing
+import rise_gen.util as util
+import yaml
+
+# trials are sent to worker processes in chunks of this size
+TRIAL_CHUNK_SIZE = 500
 
 class CreatureGroup(object):
     """A CreatureGroup is a group of creatures that acts like a single creature """
-    # TODO: move dead creatures to the end of the array when they die
 
     def __init__(self, creatures):
         self.creatures = creatures
+        # index of the first creature which may still be alive
+        # creatures before this index are known to be dead
+        self.living_index = 0
+
+    def copy(self):
+        """Return a group with a copy of every creature in this group
+
+        Yields:
+            CreatureGroup
+        """
+        return CreatureGroup([creature.copy() for creature in self.creatures])
 
     def standard_attack(self, group):
         """Attack the given group of creatures
@@ -27,25 +54,35 @@ class CreatureGroup(object):
                 c.standard_attack(target)
 
     def get_living_creature(self):
-        """Return a single living creature
+        """Return a single living creature.
+        Dead creatures are skipped once, so repeated calls within a round
+        are O(1) amortized instead of scanning the whole group.
 
         Yields:
             Creature: living creature
         """
-        for c in self.creatures:
-            if c.is_alive():
-                return c
+        creatures = self.creatures
+        i = self.living_index
+        while i < len(creatures):
+            if creatures[i].is_alive():
+                self.living_index = i
+                return creatures[i]
+            i += 1
+        self.living_index = i
         return None
 
     def refresh_round(self):
         """Refresh the round for all creatures in the group"""
         for c in self.creatures:
             c.refresh_round()
+        # the zero threshold and healing can bring creatures back above 0
+        self.living_index = 0
 
     def refresh_combat(self):
         """Refresh the combat for all creatures in the group"""
         for c in self.creatures:
             c.refresh_combat()
+        self.living_index = 0
 
     def is_alive(self):
         """Check whether any creatures in the group are alive
@@ -53,10 +90,15 @@ class CreatureGroup(object):
         Yields:
             bool: True if any creatures are alive, false otherwise
         """
-        for c in self.creatures:
-            if c.is_alive():
-                return True
-        return None
+        return self.get_living_creature() is not None
+
+    def fingerprint(self):
+        """Return a stable hash of every creature's fingerprint, in attack order
+
+        Yields:
+            str
+        """
+        return util.content_hash([c.fingerprint() for c in self.creatures])
 
     def __str__(self):
         return 'CreatureGroup({})'.format([str(c) for c in self.creatures])
@@ -108,12 +150,30 @@ def initialize_argument_parser():
         type=str,
         nargs='+',
     )
+    parser.add_argument(
+        '-c', '--cache',
+        dest='cache',
+        help='SQLite file to cache the results of seeded trials in',
+        type=str,
+    )
     parser.add_argument(
         '-t', '--test',
         dest='test',
         type=str,
         help='perform a specific test',
     )
+    parser.add_argument(
+        '--exact',
+        dest='exact',
+        help='with --test dummy, calculate exact distributions of rounds for every level instead of sampling',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        help='YAML or JSONL file of matchups to run, printing one line of JSON per matchup',
+        type=str,
+    )
     parser.add_argument(
         '-l', '--level',
         dest='level',
@@ -140,6 +200,37 @@ def initialize_argument_parser():
         nargs='?',
         type=str,
     )
+    parser.add_argument(
+        '--profile-out',
+        dest='profile out',
+        help='profile each phase separately, saving <file>.<phase>.pstats and <file>.<phase>.folded',
+        type=str,
+    )
+    parser.add_argument(
+        '--profile-interval',
+        default=0.001,
+        dest='profile interval',
+        help='seconds between call stack samples for folded stacks; 0 to disable sampling',
+        type=float,
+    )
+    parser.add_argument(
+        '--profile-workers',
+        dest='profile workers',
+        help='if true, also save a profile from each worker process',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--seed',
+        dest='seed',
+        help='seed for reproducible results',
+        type=int,
+    )
+    parser.add_argument(
+        '--stats',
+        dest='stats',
+        help='if true, print counts of cache misses, effect scans, and die rolls',
+        action='store_true',
+    )
     parser.add_argument(
         '-r', '--red',
         dest='red',
@@ -147,6 +238,19 @@ def initialize_argument_parser():
         type=str,
         nargs='+',
     )
+    parser.add_argument(
+        '--trace',
+        dest='trace',
+        help='write every strike, spell, and round of the traced trials to this JSONL file',
+        type=str,
+    )
+    parser.add_argument(
+        '--trace-trials',
+        dest='trace trials',
+        help='only trace the trials with these indices, counting from 0',
+        nargs='+',
+        type=int,
+    )
     parser.add_argument(
         '--trials',
         default=10000,
@@ -154,6 +258,12 @@ def initialize_argument_parser():
         help='The number of trials to run',
         type=int,
     )
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        help='the number of worker processes to run trials in',
+        type=int,
+    )
     parser.add_argument(
         '--bl',
         dest='blue level',
@@ -184,41 +294,411 @@ def custom_blue_modifications(blue):
     """
     pass
 
-def generate_combat_results(red, blue, trials):
-    raw_results = list()
+def simulate_combat(red, blue, trials):
+    """Run many combats and add up their results
 
+    Args:
+        red (Creature or CreatureGroup): creatures that attack first
+        blue (Creature or CreatureGroup): creatures that attack second
+        trials (int): number of combats to run
+
+    Yields:
+        dict: {'trials', 'red is alive', 'blue is alive', 'rounds'} totals
+    """
+    totals = {
+        'trials': trials,
+        'red is alive': 0,
+        'blue is alive': 0,
+        'rounds': 0,
+    }
+    instrumentation.count('trials', trials)
     for t in range(trials):
-        raw_results.append(run_combat(red, blue))
+        result = run_combat(red, blue)
+        totals['red is alive'] += result['red is alive']
+        totals['blue is alive'] += result['blue is alive']
+        totals['rounds'] += result['rounds']
+    return totals
+
+def add_combat_totals(totals, other_totals):
+    """Combine two sets of totals from simulate_combat"""
+    return {key: totals[key] + other_totals[key] for key in totals}
+
+def summarize_combat_totals(totals):
+    """Convert totals from simulate_combat into percentages and averages"""
+    trials = float(totals['trials'])
+    return {
+        'red alive %': int(totals['red is alive'] / trials * 100),
+        'blue alive %': int(totals['blue is alive'] / trials * 100),
+        'average rounds': totals['rounds'] / trials,
+    }
 
-    results = {
-        'red alive %': int([
-            True if result['red is alive'] else False
-            for result in raw_results
-        ].count(True) / float(trials) * 100),
-        'blue alive %': int([
-            True if result['blue is alive'] else False
-            for result in raw_results
-        ].count(True) / float(trials) * 100),
-        'average rounds': sum([results['rounds'] for results in raw_results]) / float(trials)
+# combatants used by worker processes; set before the pool is created
+# since creatures hold lambdas and cannot be pickled
+_worker_combatants = None
+# if set, each worker process saves a profile with this file name prefix
+worker_profile_prefix = None
+
+def _initialize_combat_worker():
+    # forked workers inherit the parent's random state
+    random.seed()
+
+def create_combat_pool(workers):
+    """Create a pool of worker processes for simulations that build sample
+    creatures. The sample creature content is loaded before forking, so
+    every worker shares it instead of loading it again.
+
+    Args:
+        workers (int): number of worker processes
+
+    Yields:
+        Pool
+    """
+    Creature.load_sample_creatures()
+    return Pool(workers, initializer=_initialize_combat_worker)
+
+def _simulate_combat_chunk(chunk_args):
+    red, blue = _worker_combatants
+    with profiling.worker_profile(worker_profile_prefix):
+        return simulate_combat_chunk(red, blue, *chunk_args)
+
+def _simulate_cached_chunk(chunk_args):
+    red, blue = _worker_combatants
+    with profiling.worker_profile(worker_profile_prefix):
+        return simulate_cached_chunk(red, blue, *chunk_args)
+
+def split_trials(trials, chunk_size=TRIAL_CHUNK_SIZE):
+    """Split a number of trials into chunks of at most chunk_size
+
+    Yields:
+        list: [(<index of first trial>, <trials>), ...]
+    """
+    return [(start, min(chunk_size, trials - start)) for start in range(0, trials, chunk_size)]
+
+def simulate_combat_chunk(red, blue, start, trials, seed=None):
+    """Run a chunk of trials, as in simulate_combat.
+    If a seed is given, the chunk's random state only depends on the seed
+    and the chunk's first trial, so results do not depend on how chunks
+    are divided between processes.
+    """
+    if seed is not None:
+        random.seed('{0}:{1}'.format(seed, start))
+    return simulate_combat(red, blue, trials)
+
+def simulate_cached_chunk(red, blue, start, trials, seed, random_state=None):
+    """Run a chunk of trials as in simulate_combat_chunk, and return the
+    random state after the last trial so that the chunk can be extended later.
+    If a random state is given, the trials continue from it instead of
+    starting from the chunk's seed.
+
+    Yields:
+        tuple: (totals as from simulate_combat, random state)
+    """
+    if random_state is None:
+        totals = simulate_combat_chunk(red, blue, start, trials, seed)
+    else:
+        random.setstate(random_state)
+        totals = simulate_combat(red, blue, trials)
+    return totals, random.getstate()
+
+def _map_in_parallel(red, blue, chunk_function, chunk_args, workers):
+    global _worker_combatants
+    _worker_combatants = (red, blue)
+    try:
+        with Pool(workers, initializer=_initialize_combat_worker) as pool:
+            return pool.map(chunk_function, chunk_args)
+    finally:
+        _worker_combatants = None
+
+def simulate_combat_in_parallel(red, blue, chunks, workers, seed=None):
+    """Run chunks of trials across a pool of worker processes
+
+    Yields:
+        list: totals for each chunk, as from simulate_combat
+    """
+    return _map_in_parallel(red, blue, _simulate_combat_chunk, [
+        (start, trials, seed) for start, trials in chunks
+    ], workers)
+
+def simulate_cached_chunks(red, blue, chunk_args, workers=None):
+    """Run chunks of trials as in simulate_cached_chunk, optionally across
+    a pool of worker processes
+
+    Args:
+        chunk_args (list): [(<start>, <trials>, <seed>, <random state or None>), ...]
+
+    Yields:
+        list: (totals, random state) for each chunk
+    """
+    if workers is None or workers <= 1:
+        return [simulate_cached_chunk(red, blue, *args) for args in chunk_args]
+    return _map_in_parallel(red, blue, _simulate_cached_chunk, chunk_args, workers)
+
+def generate_combat_results(red, blue, trials, workers=None, seed=None, cache=None):
+    """Run many combats and summarize their results
+
+    Args:
+        red (Creature or CreatureGroup): creatures that attack first
+        blue (Creature or CreatureGroup): creatures that attack second
+        trials (int): number of combats to run
+        workers (int): number of worker processes; None or 1 to run serially
+        seed (varies): if given, results are reproducible for any number of workers
+        cache (ResultCache): if given with a seed, trials that were already
+            run are read from the cache and new trials are added to it.
+            A cached chunk with fewer trials than needed is continued from
+            where it stopped rather than run again.
+
+    Yields:
+        dict: {'red alive %', 'blue alive %', 'average rounds'}
+    """
+    chunks = split_trials(trials)
+    if cache is None or seed is None:
+        with instrumentation.phase('simulation'):
+            if workers is None or workers <= 1:
+                chunk_totals = [
+                    simulate_combat_chunk(red, blue, start, chunk_trials, seed)
+                    for start, chunk_trials in chunks
+                ]
+            else:
+                chunk_totals = simulate_combat_in_parallel(red, blue, chunks, workers, seed)
+        with instrumentation.phase('aggregation'):
+            return summarize_combat_totals(reduce(add_combat_totals, chunk_totals))
+
+    cache_key = cache.key(red, blue, seed, TRIAL_CHUNK_SIZE)
+    cached_chunks = cache.get_chunks(cache_key)
+    # chunks that are not cached, and the shorter cached chunk that each
+    # continues from, if any, so only the trials that were never run are run
+    missing_chunks = list()
+    for chunk in chunks:
+        if chunk not in cached_chunks:
+            missing_chunks.append((chunk, ResultCache.longest_partial_chunk(cached_chunks, *chunk)))
+
+    with instrumentation.phase('simulation'):
+        results = simulate_cached_chunks(red, blue, [
+            (start, chunk_trials, seed, None) if partial_chunk is None else (
+                start,
+                chunk_trials - partial_chunk[1],
+                seed,
+                cached_chunks[partial_chunk]['random state'],
+            )
+            for (start, chunk_trials), partial_chunk in missing_chunks
+        ], workers)
+    new_chunks = dict()
+    for (chunk, partial_chunk), (totals, random_state) in zip(missing_chunks, results):
+        if partial_chunk is not None:
+            totals = add_combat_totals(cached_chunks[partial_chunk]['totals'], totals)
+        new_chunks[chunk] = {'totals': totals, 'random state': random_state}
+    if new_chunks:
+        cache.add_chunks(cache_key, new_chunks)
+
+    with instrumentation.phase('aggregation'):
+        totals = reduce(add_combat_totals, [
+            cached_chunks[chunk]['totals'] if chunk in cached_chunks else new_chunks[chunk]['totals']
+            for chunk in chunks
+        ])
+        return summarize_combat_totals(totals)
+
+# groups of sample creatures, keyed by their side, names, and level
+_sample_groups = dict()
+
+def sample_group(names, level, side='red'):
+    """Return a CreatureGroup of sample creatures, reusing a group with the
+    same side, names, and level if one was already built. Creatures are
+    refreshed after every combat, so groups can be shared between combats.
+    Each side has its own groups, so the red and blue groups of a mirror
+    matchup are different creatures.
+
+    Args:
+        names (list): names of sample creatures
+        level (int): level of every creature in the group
+        side (str): 'red' or 'blue', the side the group fights on
+
+    Yields:
+        CreatureGroup
+    """
+    key = (side, tuple(names), level)
+    if key not in _sample_groups:
+        _sample_groups[key] = CreatureGroup([
+            Creature.from_sample_creature(name, level=level) for name in names
+        ])
+    return _sample_groups[key]
+
+def load_jobs(file_name):
+    """Load a list of matchups from a JSONL file, with one job per line,
+    or a YAML file containing a list of jobs
+
+    Yields:
+        list: [{'red', 'blue', 'level', 'red level', 'blue level', 'trials', 'seed'}, ...]
+            where only 'red' and 'blue' are required
+    """
+    with open(file_name, 'r') as jobs_file:
+        if file_name.endswith('.jsonl'):
+            jobs = [json.loads(line) for line in jobs_file if line.strip()]
+        else:
+            jobs = yaml.safe_load(jobs_file)
+    if not isinstance(jobs, list):
+        raise Exception("Error: expected a list of jobs in '{0}'".format(file_name))
+    return jobs
+
+def job_settings(job, defaults):
+    """Fill in a job's settings from the defaults
+
+    Yields:
+        dict: {'red', 'blue', 'red level', 'blue level', 'trials', 'seed'}
+            with 'red' and 'blue' as lists of names
+    """
+    sides = dict()
+    for side in ['red', 'blue']:
+        if side not in job:
+            raise Exception("Error: job is missing '{0}'".format(side))
+        # a single creature can be given by name instead of as a list
+        sides[side] = [job[side]] if isinstance(job[side], str) else list(job[side])
+    level = job.get('level', defaults['level'])
+    return {
+        'red': sides['red'],
+        'blue': sides['blue'],
+        'red level': job.get('red level', level),
+        'blue level': job.get('blue level', level),
+        'trials': job.get('trials', defaults['trials']),
+        'seed': job.get('seed', defaults['seed']),
     }
 
-    return results
+def run_job(job_args):
+    """Run a single job from a jobs file
+
+    Args:
+        job_args (tuple): (index, job, defaults, cache file name)
+
+    Yields:
+        dict: the job's settings and either 'results' or 'error'
+    """
+    index, job, defaults, cache_file_name = job_args
+    result = {'job': index}
+    cache = None
+    try:
+        result.update(job_settings(job, defaults))
+        if cache_file_name is not None:
+            cache = ResultCache(cache_file_name)
+        result['results'] = generate_combat_results(
+            sample_group(result['red'], result['red level'], 'red'),
+            sample_group(result['blue'], result['blue level'], 'blue'),
+            result['trials'],
+            seed=result['seed'],
+            cache=cache,
+        )
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        if cache is not None:
+            cache.close()
+    return result
+
+def _job_key(job, defaults):
+    """Return a key shared by seeded jobs whose creatures fight identically,
+    or None if the job cannot share results with other jobs"""
+    try:
+        settings = job_settings(job, defaults)
+        if settings['seed'] is None:
+            return None
+        return (
+            sample_group(settings['red'], settings['red level'], 'red').fingerprint(),
+            sample_group(settings['blue'], settings['blue level'], 'blue').fingerprint(),
+            settings['trials'],
+            settings['seed'],
+        )
+    except Exception:
+        # run_job reports the error
+        return None
+
+def generate_job_results(jobs, defaults, workers=None, cache_file_name=None):
+    """Run jobs and yield their results as soon as each job finishes.
+    Jobs are run in order if workers is None or 1.
+
+    Creature groups for seeded jobs are built before any worker starts, so
+    the workers share them, and seeded jobs whose creatures fight identically
+    are only run once.
+
+    Args:
+        jobs (list): jobs as from load_jobs
+        defaults (dict): {'level', 'trials', 'seed'} for jobs that do not set them
+        workers (int): number of worker processes; None or 1 to run serially
+        cache_file_name (str): SQLite file for a ResultCache shared by every job
+    """
+    job_args = list()
+    # {<index of a job that is run>: [<index of an identical job>, ...]}
+    duplicates = defaultdict(list)
+    first_jobs = dict()
+    for index, job in enumerate(jobs):
+        key = _job_key(job, defaults)
+        if key is not None and key in first_jobs:
+            duplicates[first_jobs[key]].append(index)
+            continue
+        if key is not None:
+            first_jobs[key] = index
+        job_args.append((index, job, defaults, cache_file_name))
+
+    if workers is None or workers <= 1:
+        pool = None
+        results = map(run_job, job_args)
+    else:
+        pool = create_combat_pool(workers)
+        results = pool.imap_unordered(run_job, job_args)
+    try:
+        for result in results:
+            yield result
+            for index in duplicates[result['job']]:
+                duplicate_result = {'job': index}
+                duplicate_result.update(job_settings(jobs[index], defaults))
+                duplicate_result['results'] = result.get('results')
+                if 'error' in result:
+                    duplicate_result['error'] = result['error']
+                yield duplicate_result
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def run_jobs(args):
+    """Run every job in the jobs file and print one line of JSON per job"""
+    defaults = {
+        'level': args['level'],
+        'trials': args['trials'],
+        'seed': args.get('seed'),
+    }
+    for result in generate_job_results(
+            load_jobs(args['jobs']),
+            defaults,
+            workers=args.get('workers'),
+            cache_file_name=args.get('cache'),
+    ):
+        print(json.dumps(result), flush=True)
+
+TRAINING_DUMMY_CREATURES = 'barbarian barbarian_greatsword cleric cleric_spells druid druid_spells fighter fighter_dex ranger rogue rogue_str sorcerer warrior warrior_dex warrior_str_dex wizard'.split()
 
 def test_training_dummy(level, trials):
-    sample_creature_names = 'barbarian barbarian_greatsword cleric cleric_spells druid druid_spells fighter fighter_dex ranger rogue rogue_str sorcerer warrior warrior_dex warrior_str_dex wizard'.split()
-    sample_creatures = [Creature.from_sample_creature(name, level=level) for name in sample_creature_names]
-    training_dummy = Creature.from_sample_creature('dummy', level=level)
+    with instrumentation.phase('construction'):
+        sample_creatures = [Creature.from_sample_creature(name, level=level) for name in TRAINING_DUMMY_CREATURES]
+        training_dummy = Creature.from_sample_creature('dummy', level=level)
 
     results = dict()
 
-    for creature in sample_creatures:
-        for i in range(trials):
-            rounds_to_defeat_dummy = run_combat(creature, training_dummy)['rounds']
-            try:
-                results[creature.name] += rounds_to_defeat_dummy
-            except KeyError:
-                results[creature.name] = rounds_to_defeat_dummy
-        results[creature.name] /= trials
+    # creatures that fight identically only need to be simulated once
+    results_by_fingerprint = dict()
+
+    with instrumentation.phase('simulation'):
+        for creature in sample_creatures:
+            fingerprint = creature.fingerprint()
+            if fingerprint in results_by_fingerprint:
+                results[creature.name] = results_by_fingerprint[fingerprint]
+                continue
+            instrumentation.count('trials', trials)
+            for i in range(trials):
+                rounds_to_defeat_dummy = run_combat(creature, training_dummy)['rounds']
+                try:
+                    results[creature.name] += rounds_to_defeat_dummy
+                except KeyError:
+                    results[creature.name] = rounds_to_defeat_dummy
+            results[creature.name] /= trials
+            results_by_fingerprint[fingerprint] = results[creature.name]
 
     for key in results.keys():
         results[key] = round(results[key], 1)
@@ -226,18 +706,105 @@ def test_training_dummy(level, trials):
     pprint(results)
 
 
+# (creature, training dummy) pairs used by worker processes; set before
+# the pool is created since creatures hold lambdas and cannot be pickled
+_worker_dummy_matchups = None
+
+def _training_dummy_rounds_pmf(index):
+    creature, training_dummy = _worker_dummy_matchups[index]
+    return combat_rounds_pmf(creature, training_dummy)
+
+def exact_training_dummy(levels, workers=None):
+    """Calculate the exact distribution of the rounds each training dummy
+    creature needs to defeat the dummy, at every level in one pass
+
+    Args:
+        levels (list): levels to calculate
+        workers (int): number of worker processes; None or 1 to run serially
+
+    Yields:
+        tuple: ({<creature name>: {<level>: {<rounds>: <probability>}}},
+            {<creature name>: <error building the creature>})
+    """
+    global _worker_dummy_matchups
+    results = defaultdict(dict)
+    errors = dict()
+    matchups = list()
+    # {(<fingerprint>, <level>): <index in matchups>}
+    matchup_indices = dict()
+    # [(<creature name>, <level>, <index in matchups>), ...]
+    entries = list()
+    with instrumentation.phase('construction'):
+        for level in levels:
+            training_dummy = Creature.from_sample_creature('dummy', level=level)
+            for name in TRAINING_DUMMY_CREATURES:
+                if name in errors:
+                    continue
+                try:
+                    creature = Creature.from_sample_creature(name, level=level)
+                    key = (creature.fingerprint(), level)
+                except Exception as e:
+                    errors[name] = str(e)
+                    continue
+                # creatures that fight identically only need to be calculated once
+                if key not in matchup_indices:
+                    matchup_indices[key] = len(matchups)
+                    matchups.append((creature, training_dummy))
+                entries.append((name, level, matchup_indices[key]))
+
+    _worker_dummy_matchups = matchups
+    try:
+        with instrumentation.phase('simulation'):
+            if workers is None or workers <= 1:
+                pmfs = list(map(_training_dummy_rounds_pmf, range(len(matchups))))
+            else:
+                with Pool(workers, initializer=_initialize_combat_worker) as pool:
+                    pmfs = pool.map(_training_dummy_rounds_pmf, range(len(matchups)))
+    finally:
+        _worker_dummy_matchups = None
+
+    for name, level, index in entries:
+        results[name][level] = pmfs[index]
+    return dict(results), errors
+
+def summarize_rounds_pmf(pmf):
+    """Summarize a PMF from combat_rounds_pmf with its mean and percentiles"""
+    summary = {'mean': round(distribution.mean(pmf), 2)}
+    for fraction in [0.1, 0.25, 0.5, 0.75, 0.9]:
+        summary['{0}%'.format(int(fraction * 100))] = percentile(pmf, fraction)
+    return summary
+
+def test_exact_training_dummy(workers=None, verbose=False):
+    results, errors = exact_training_dummy(range(1, 21), workers)
+    for name in TRAINING_DUMMY_CREATURES:
+        if name in errors:
+            print('{0}: {1}'.format(name, errors[name]))
+            continue
+        print(name)
+        print(format_level_table({
+            level: summarize_rounds_pmf(pmf)
+            for level, pmf in results[name].items()
+        }))
+        if verbose:
+            pprint({
+                level: {rounds: round(p, 6) for rounds, p in pmf.items()}
+                for level, pmf in results[name].items()
+            })
+
+
 def main(args):
-    blue_creatures = [Creature.from_sample_creature(
-        name,
-        level=args['blue level'] or args['level']
-    ) for name in args['blue']]
-    blue = CreatureGroup(blue_creatures)
-
-    red_creatures = [Creature.from_sample_creature(
-        name,
-        level=args['red level'] or args['level']
-    ) for name in args['red']]
-    red = CreatureGroup(red_creatures)
+    with instrumentation.phase('construction'):
+        blue_creatures = [Creature.from_sample_creature(
+            name,
+            level=args['blue level'] or args['level']
+        ) for name in args['blue']]
+        blue = CreatureGroup(blue_creatures)
+
+        red_creatures = [Creature.from_sample_creature(
+            name,
+            level=args['red level'] or args['level']
+        ) for name in args['red']]
+        red = CreatureGroup(red_creatures)
 
     custom_blue_modifications(blue)
     custom_red_modifications(red)
@@ -245,12 +812,26 @@ def main(args):
     if args.get('verbose'):
         print("RED:\n{}\nBLUE:\n{}".format(red, blue))
 
-    pprint(generate_combat_results(red, blue, args['trials']))
-
-if __name__ == "__main__":
-    cmd_args = initialize_argument_parser()
-    if cmd_args.get('profile'):
-        cProfile.run('main(cmd_args)', sort=cmd_args.get('profile'))
+    cache = ResultCache(args['cache']) if args.get('cache') else None
+    try:
+        pprint(generate_combat_results(
+            red,
+            blue,
+            args['trials'],
+            workers=args.get('workers'),
+            seed=args.get('seed'),
+            cache=cache,
+        ))
+    finally:
+        if cache is not None:
+            cache.close()
+
+def run(cmd_args):
+    """Run main(), a jobs file, or one of the tests, depending on the arguments"""
+    if cmd_args.get('jobs'):
+        run_jobs(cmd_args)
+    elif cmd_args.get('test') == 'dummy' and cmd_args.get('exact'):
+        test_exact_training_dummy(cmd_args.get('workers'), cmd_args.get('verbose'))
     elif cmd_args.get('test') == 'dummy':
         test_training_dummy(
             level=cmd_args['level'],
@@ -271,3 +852,36 @@ if __name__ == "__main__":
             main(cmd_args)
     else:
         main(cmd_args)
+
+if __name__ == "__main__":
+    cmd_args = initialize_argument_parser()
+    if cmd_args.get('stats'):
+        if (cmd_args.get('workers') or 1) > 1:
+            print("Warning: statistics are only counted in this process, not in workers")
+        instrumentation.enable(Creature)
+    if cmd_args.get('cache') and cmd_args.get('seed') is None:
+        print("Warning: only seeded results are cached; use --seed")
+    if cmd_args.get('trace'):
+        if (cmd_args.get('workers') or 1) > 1:
+            print("Warning: tracing runs trials in this process, ignoring workers")
+            cmd_args['workers'] = None
+        tracing.enable(
+            tracing.JsonLinesSink(cmd_args['trace']),
+            Creature,
+            sys.modules[__name__],
+            cmd_args.get('trace trials'),
+        )
+    if cmd_args.get('profile out'):
+        if cmd_args.get('profile workers'):
+            worker_profile_prefix = cmd_args['profile out']
+        with profiling.profiling(cmd_args['profile out'], cmd_args['profile interval']) as profiler:
+            run(cmd_args)
+        if cmd_args.get('profile'):
+            profiler.print_stats(cmd_args['profile'])
+    elif cmd_args.get('profile'):
+        cProfile.run('run(cmd_args)', sort=cmd_args.get('profile'))
+    else:
+        run(cmd_args)
+    if cmd_args.get('stats'):
+        print(instrumentation.format_report())
+    tracing.disable()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 
 import argparse
+import copy
 from rise_gen.ability import Ability
 from rise_gen.dice import Die, DieCollection, d20
+import rise_gen.distribution as distribution
+import rise_gen.instrumentation as instrumentation
 from rise_gen.monster_leveler import MonsterLeveler
 from rise_gen.rise_data import (
-    Armor, MonsterClass, MonsterType, Race, RiseClass, Shield, Weapon, calculate_attribute_progression
+    Armor, MonsterClass, MonsterType, Race, RiseClass, Shield, Weapon,
+    MAX_TABLE_LEVEL, calculate_attribute_progression
 )
 import rise_gen.util as util
 
@@ -18,8 +22,64 @@ ATTRIBUTES = """
     willpower
 """.split()
 
+# statistics shown in a level table unless others are requested
+LEVEL_TABLE_STATISTICS = """
+    accuracy
+    attack_count
+    damage_dice
+    damage_bonus
+    hit_points
+    armor_defense
+    maneuver_defense
+    fortitude
+    reflex
+    mental
+    damage_reduction
+""".split()
+
+# statistics included in a creature's stat block
+STAT_BLOCK_STATISTICS = ATTRIBUTES + """
+    hit_points
+    temporary_hit_points
+    damage_reduction
+    armor_defense
+    maneuver_defense
+    fortitude
+    reflex
+    mental
+    accuracy
+    attack_count
+    damage_dice
+    damage_bonus
+    critical_threshold
+    critical_multiplier
+    combat_prowess
+    land_speed
+    space
+    reach
+""".split()
+
+# statistics that affect how a creature fights
+COMBAT_STATISTICS = """
+    hit_points
+    damage_reduction
+    armor_defense
+    fortitude
+    reflex
+    mental
+    accuracy
+    attack_count
+    damage_dice
+    damage_bonus
+    critical_threshold
+    critical_multiplier
+""".split()
+
 
 class CreatureStatistics(object):
+    # names of every property added with create_cached_property
+    cached_property_names = list()
+
     def __init__(
             self,
             name,
@@ -135,6 +195,84 @@ class CreatureStatistics(object):
         """
         self._cache = dict()
 
+    def level_table(self, levels, statistics=None):
+        """Calculate statistics for this creature at each of the given levels.
+        A copy of the creature is re-levelled rather than a new creature
+        being built for each level, so its abilities, equipment, and class
+        data are only resolved once. The creature itself is never changed,
+        so it stays correct if a statistic fails or while it is in use elsewhere.
+
+        Args:
+            levels (list): levels to calculate statistics for
+            statistics (list): names of the statistics to calculate.
+                Defaults to LEVEL_TABLE_STATISTICS.
+
+        Yields:
+            dict: {<level>: {<statistic>: <value>, ...}, ...}
+        """
+
+        statistics = statistics or LEVEL_TABLE_STATISTICS
+        creature = copy.copy(self)
+        creature.abilities = list(self.abilities)
+        table = dict()
+        for level in levels:
+            creature.level = level
+            creature.clear_cache()
+            table[level] = {
+                statistic: getattr(creature, statistic)
+                for statistic in statistics
+            }
+        return table
+
+    def stat_block(self):
+        """Return the creature's computed statistics as plain data
+
+        Yields:
+            dict: {<statistic>: <value>, ...} with dice rendered as strings
+        """
+        stat_block = {
+            'name': self.name,
+            'level': self.level,
+        }
+        for statistic in STAT_BLOCK_STATISTICS:
+            stat_block[statistic] = stat_block_value(getattr(self, statistic))
+        return stat_block
+
+    def combat_statistics(self):
+        """Return everything about the creature that affects combat as plain data.
+        Unlike a stat block, this excludes the name, which has no effect on
+        combat. The level is only included if the creature has end of round
+        effects, since those can read the level during combat (such as
+        fast healing); otherwise it only matters through the calculated
+        statistics.
+
+        Yields:
+            dict
+        """
+        data = {
+            statistic: stat_block_value(getattr(self, statistic))
+            for statistic in COMBAT_STATISTICS
+        }
+        data['attack_type'] = self.attack_type
+        if self.attack_type == 'physical' and self.weapon.dual_wielding:
+            data['off_hand_dice'] = str(self.weapon.dice)
+        data['end_of_round_effects'] = [
+            effect.signature() for effect in self.end_of_round_effects
+        ]
+        if data['end_of_round_effects']:
+            data['level'] = self.level
+        return data
+
+    def fingerprint(self):
+        """Return a stable hash of everything that affects combat.
+        Creatures with the same fingerprint fight identically, even if they
+        have different names or definitions.
+
+        Yields:
+            str
+        """
+        return util.content_hash(self.combat_statistics())
+
     def has_ability(self, ability_name, ignore_prerequisites=False):
         """Check whether the creature has a given ability.
         The creature must meet the prerequisites for the ability unless
@@ -319,6 +457,11 @@ class CreatureStatistics(object):
 
         return damage_dice
 
+    def _calculate_spell_damage_sampler(self):
+        """Samples the total of the creature's damage dice with a single
+        random number, since spells can roll dozens of dice (Sampler)"""
+        return distribution.dice_sampler(self.damage_dice)
+
     def _calculate_attribute(self, attribute_name):
         """Any of the creature's main attributes:
         strength, dexterity, constitution, intelligence, perception, willpower
@@ -629,6 +772,7 @@ def create_cached_property(
                     else getattr(creature, calculation_function)()
             )
     setattr(CreatureStatistics, property_name, property(get_cached_property))
+    CreatureStatistics.cached_property_names.append(property_name)
 
 # add cached properties to CreatureStatistics for easy access
 cached_properties = """
@@ -661,6 +805,12 @@ create_cached_property(
     calculation_function='_calculate_numerical_statistic',
     calculation_args='temporary hit points'
 )
+create_cached_property(
+    property_name='end_of_round_effects',
+    calculation_function='active_effects_with_tag',
+    calculation_args='end of round'
+)
+create_cached_property('spell_damage_sampler')
 create_cached_property(
     property_name='damage_reduction',
     calculation_function='_calculate_numerical_statistic',
@@ -682,15 +832,50 @@ class Creature(CreatureStatistics):
 
         self.refresh_combat()
 
+    def clear_cache(self):
+        super().clear_cache()
+        # the round hooks are compiled from cached values
+        self._round_hooks = None
+
+    def copy(self):
+        """Return a copy of the creature that can be modified without
+        affecting the original. The copy shares the creature's definition
+        and starts with its cached statistics, so nothing is recalculated
+        unless the copy's cache is cleared.
+
+        Yields:
+            Creature
+        """
+        creature = copy.copy(self)
+        creature.abilities = list(self.abilities)
+        creature._cache = dict(self._cache)
+        creature.refresh_combat()
+        return creature
+
+    def compile_round_hooks(self):
+        """Compile the effects and values that refresh_round applies every round.
+        This is done once per combat rather than once per round.
+
+        Yields:
+            list: 'end of round' effects to call each round
+        """
+        self._round_hooks = self.end_of_round_effects
+        self._round_damage_reduction = self.damage_reduction
+        return self._round_hooks
+
     def refresh_combat(self):
         self.current_hit_points = self.hit_points
         self.zero_threshold = True
+        self.compile_round_hooks()
         self.refresh_round()
 
     def refresh_round(self):
-        for effect in self.active_effects_with_tag('end of round'):
+        round_hooks = self._round_hooks
+        if round_hooks is None:
+            round_hooks = self.compile_round_hooks()
+        for effect in round_hooks:
             effect(self)
-        self.available_damage_reduction = self.damage_reduction
+        self.available_damage_reduction = self._round_damage_reduction
         if self.current_hit_points <= 0:
             # apply the zero threshold
             if (self.zero_threshold
@@ -767,7 +952,7 @@ class Creature(CreatureStatistics):
         roll = d20.roll()
         attack_result = roll + self.accuracy
         #TODO: implement generic framework for spells
-        spell_damage = self.roll_damage()
+        spell_damage = self.spell_damage_sampler.sample() + self.damage_bonus
         defense = min(creature.fortitude, creature.mental, creature.reflex)
         # critical success double damage
         if attack_result >= defense + 10:
@@ -808,11 +993,21 @@ class Creature(CreatureStatistics):
         return damage
 
     @classmethod
-    def from_sample_creature(cls, sample_name, **kwargs):
+    def load_sample_creatures(cls):
+        """Load the sample creature definitions if they are not already loaded
+
+        Yields:
+            dict: properties of each sample creature, including monsters
+        """
         if cls.sample_creatures is None:
             cls.sample_creatures = util.import_yaml_file('content/sample_creatures.yaml')
             # also add monsters, which are stored separately
             cls.sample_creatures.update(util.import_yaml_file('content/monsters.yaml'))
+        return cls.sample_creatures
+
+    @classmethod
+    def from_sample_creature(cls, sample_name, **kwargs):
+        cls.load_sample_creatures()
 
         try:
             sample_properties = cls.sample_creatures[sample_name].copy()
@@ -824,7 +1019,7 @@ class Creature(CreatureStatistics):
             )
 
         # enforce underscores instead of spaces
-        for key in sample_properties:
+        for key in list(sample_properties):
             python_key = key.replace(' ', '_')
             if key != python_key:
                 sample_properties[python_key] = sample_properties.pop(key)
@@ -835,34 +1030,63 @@ class Creature(CreatureStatistics):
 
         # use a monster leveler to automatically determine level
         if sample_properties.get('level') is None:
-            leveler = MonsterLeveler.from_monster_name(sample_name)
-            sample_properties['level'] = int(round(leveler.level()))
+            sample_properties['level'] = int(round(
+                MonsterLeveler.effective_level_by_monster_name(sample_name)
+            ))
 
         return cls(
             name=sample_name,
             properties=sample_properties
         )
 
+def stat_block_value(value):
+    """Convert a statistic into plain data; dice are rendered as strings"""
+    if isinstance(value, (Die, DieCollection)):
+        return str(value)
+    return value
+
+BASE_CLASS_DEFENSE_BONUSES = {
+    'good': 4,
+    'average': 2,
+    'poor': 0,
+}
+
+COMBAT_PROWESS_PROGRESSIONS = {
+    'good': lambda level: level + 2,
+    'average': lambda level: (level * 4) // 5 + 1,
+    'poor': lambda level: (level * 2) // 3 + 1,
+}
+
+BASE_DEFENSE_PROGRESSIONS = {
+    'good': lambda level: (level * 5) // 4,
+    'average': lambda level: level,
+    'poor': lambda level: (level * 3) // 4,
+}
+
+COMBAT_PROWESS_TABLE = {
+    progression: [calculate(level) for level in range(MAX_TABLE_LEVEL + 1)]
+    for progression, calculate in COMBAT_PROWESS_PROGRESSIONS.items()
+}
+
+BASE_DEFENSE_TABLE = {
+    progression: [calculate(level) for level in range(MAX_TABLE_LEVEL + 1)]
+    for progression, calculate in BASE_DEFENSE_PROGRESSIONS.items()
+}
+
 def base_class_defense_bonus(progression):
-    return {
-        'good': 4,
-        'average': 2,
-        'poor': 0,
-    }[progression]
+    return BASE_CLASS_DEFENSE_BONUSES[progression]
 
 def calculate_combat_prowess(progression, level):
-    return {
-        'good': level + 2,
-        'average': (level * 4) // 5 + 1,
-        'poor': (level * 2) // 3 + 1,
-    }[progression]
+    if 0 <= level <= MAX_TABLE_LEVEL:
+        return COMBAT_PROWESS_TABLE[progression][level]
+    else:
+        return COMBAT_PROWESS_PROGRESSIONS[progression](level)
 
 def calculate_base_defense(progression, level):
-    return {
-        'good': (level * 5) // 4,
-        'average': level,
-        'poor': (level * 3) // 4,
-    }[progression]
+    if 0 <= level <= MAX_TABLE_LEVEL:
+        return BASE_DEFENSE_TABLE[progression][level]
+    else:
+        return BASE_DEFENSE_PROGRESSIONS[progression](level)
 
 def default_land_speed(size):
     return {
@@ -919,6 +1143,18 @@ def initialize_argument_parser():
         type=str,
         help="Create a sample character instead of a new character",
     )
+    parser.add_argument(
+        '--stats',
+        dest='stats',
+        action='store_true',
+        help="print how often cached properties and effects were calculated",
+    )
+    parser.add_argument(
+        '-t', '--table',
+        dest='table',
+        action='store_true',
+        help="print a table of the sample character's statistics at every level",
+    )
     parser.add_argument(
         '-w', '--weapon',
         dest='weapon',
@@ -928,17 +1164,45 @@ def initialize_argument_parser():
     return vars(parser.parse_args())
 
 
+def format_level_table(table):
+    """Format a table from CreatureStatistics.level_table as text,
+    with one row per level and one column per statistic"""
+    levels = sorted(table.keys())
+    statistics = list(table[levels[0]].keys()) if levels else list()
+    rows = [['level'] + statistics]
+    for level in levels:
+        rows.append([str(level)] + [
+            str(table[level][statistic]) for statistic in statistics
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join([
+        ' '.join(value.rjust(width) for value, width in zip(row, widths))
+        for row in rows
+    ])
+
+
 def main():
     args = initialize_argument_parser()
+    if args.get('stats'):
+        instrumentation.enable(Creature)
 
     if args['sample_creature']:
         for sample_name in args['sample_creature']:
-            sample_creature = Creature.from_sample_creature(
-                sample_name,
-                level=args.get('level'),
-                starting_attributes=args.get('starting_attributes'),
-            )
-            print(sample_creature)
+            with instrumentation.phase('construction'):
+                sample_creature = Creature.from_sample_creature(
+                    sample_name,
+                    level=args.get('level'),
+                    starting_attributes=args.get('starting_attributes'),
+                )
+            with instrumentation.phase('statistics'):
+                if args.get('table'):
+                    text = '\n'.join([
+                        sample_creature.name,
+                        format_level_table(sample_creature.level_table(range(1, 21))),
+                    ])
+                else:
+                    text = str(sample_creature)
+            print(text)
     else:
         if args['rise_class']:
             rise_class = RiseClass.from_name(args['rise_class'])
@@ -967,5 +1231,8 @@ def main():
         )
         print(creature)
 
+    if args.get('stats'):
+        print(instrumentation.format_report())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+
+import argparse
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from rise_gen.creature import Creature, format_level_table
+import rise_gen.distribution as distribution
+
+# run_combat keeps fighting while fewer than 101 rounds have been run
+MAX_COMBAT_ROUNDS = 101
+# survival_probabilities ignores states that are less likely than this
+NEGLIGIBLE_PROBABILITY = 1e-18
+
+
+def attack_profile(creature):
+    """Return a hashable snapshot of everything that affects a creature's attacks
+
+    Args:
+        creature (Creature)
+
+    Yields:
+        tuple
+    """
+    dice = tuple((die.size, die.count) for die in creature.damage_dice.dice)
+    if creature.attack_type == 'physical' and creature.weapon.dual_wielding:
+        extra_dice = tuple((die.size, die.count) for die in creature.weapon.dice.dice)
+    else:
+        extra_dice = None
+    return (
+        creature.attack_type,
+        creature.accuracy,
+        creature.attack_count,
+        creature.critical_threshold,
+        creature.critical_multiplier,
+        dice,
+        creature.damage_bonus,
+        extra_dice,
+    )
+
+
+def defense_profile(creature):
+    """Return a hashable snapshot of everything that affects the damage a
+    creature takes from attacks
+
+    Yields:
+        tuple: (<armor defense>, <spell defense>, <damage reduction>)
+    """
+    return (
+        creature.armor_defense,
+        min(creature.fortitude, creature.mental, creature.reflex),
+        creature.damage_reduction,
+    )
+
+
+def dice_tuple_pmf(dice):
+    """Return the PMF of rolling dice from an attack profile
+
+    Args:
+        dice (tuple): ((<size>, <count>), ...)
+    """
+    pmf = {0: 1.0}
+    for size, count in dice:
+        pmf = distribution.convolve(pmf, distribution.die_pmf(size, count))
+    return pmf
+
+
+# results are shared between every attacker and defender with the same profiles
+_strike_outcomes = dict()
+_round_damage_pmfs = dict()
+
+
+def strike_outcomes(profile, defense):
+    """Return the possible results of a single attack, as in
+    Creature.strike or Creature.attack_with_spell.
+    Results are cached and must not be modified.
+
+    Args:
+        profile (tuple): the attacker's attack_profile
+        defense (int): the target's armor defense for physical attacks,
+            or its lowest of fortitude, mental, and reflex for spells
+
+    Yields:
+        list: [(<probability>, [<PMF of each take_damage call, in order>]), ...]
+            with the outcomes in the order miss, hit, critical hit
+    """
+    key = (profile, defense)
+    try:
+        return _strike_outcomes[key]
+    except KeyError:
+        pass
+
+    (attack_type, accuracy, attack_count, critical_threshold,
+     critical_multiplier, dice, damage_bonus, extra_dice) = profile
+    damage_pmf = distribution.add_constant(dice_tuple_pmf(dice), damage_bonus)
+    miss_chance = hit_chance = critical_chance = 0
+    if attack_type == 'physical':
+        for roll in range(1, 21):
+            attack_result = roll + accuracy
+            if roll == 20:
+                attack_result += 10
+            elif roll == 1:
+                attack_result -= 10
+            if attack_result < defense:
+                miss_chance += 1 / 20.0
+            elif roll >= critical_threshold:
+                critical_chance += 1 / 20.0
+            else:
+                hit_chance += 1 / 20.0
+
+        # a hit deals damage twice; the second damage roll includes the
+        # off hand weapon and any critical hit damage
+        second_hit_pmf = damage_pmf
+        if extra_dice is not None:
+            second_hit_pmf = distribution.convolve(second_hit_pmf, dice_tuple_pmf(extra_dice))
+        second_critical_pmf = distribution.convolve(
+            second_hit_pmf,
+            distribution.convolve_power(damage_pmf, critical_multiplier - 1),
+        )
+        outcomes = [
+            (miss_chance, []),
+            (hit_chance, [damage_pmf, second_hit_pmf]),
+            (critical_chance, [damage_pmf, second_critical_pmf]),
+        ]
+    elif attack_type == 'spell':
+        for roll in range(1, 21):
+            attack_result = roll + accuracy
+            if attack_result >= defense + 10:
+                critical_chance += 1 / 20.0
+            elif attack_result >= defense:
+                hit_chance += 1 / 20.0
+            else:
+                miss_chance += 1 / 20.0
+        # spells deal half damage on a miss and double damage on a critical hit
+        outcomes = [
+            (miss_chance, [distribution.transform(damage_pmf, lambda d: d // 2)]),
+            (hit_chance, [damage_pmf]),
+            (critical_chance, [distribution.transform(damage_pmf, lambda d: d * 2)]),
+        ]
+    else:
+        raise Exception("Error: invalid attack type '{0}'".format(attack_type))
+    return _strike_outcomes.setdefault(key, outcomes)
+
+
+def _take_damage(states, damage_pmf):
+    """Apply a take_damage call to every state of (available damage
+    reduction, damage taken this round), as in Creature.take_damage"""
+    new_states = dict()
+    for (reduction, taken), probability in states.items():
+        for damage, damage_probability in damage_pmf.items():
+            new_reduction = reduction
+            if reduction > 0:
+                reduced_damage = max(0, damage - reduction)
+                new_reduction -= damage - reduced_damage
+                damage = reduced_damage
+            key = (new_reduction, taken + damage)
+            new_states[key] = new_states.get(key, 0) + probability * damage_probability
+    return new_states
+
+
+def round_damage_pmf(attacker, defender):
+    """Return the PMF of the damage the defender takes from the attacker's
+    standard attack in one round, after damage reduction.
+    Results are cached by the creatures' attack and defense profiles,
+    and must not be modified.
+
+    Args:
+        attacker (Creature)
+        defender (Creature)
+
+    Yields:
+        dict
+    """
+    return profile_round_damage_pmf(attack_profile(attacker), defense_profile(defender))
+
+
+def profile_round_damage_pmf(profile, defenses):
+    """round_damage_pmf for an attack_profile and a defense_profile"""
+    key = (profile, defenses)
+    try:
+        return _round_damage_pmfs[key]
+    except KeyError:
+        pass
+
+    armor_defense, spell_defense, damage_reduction = defenses
+    if profile[0] == 'physical':
+        outcomes = strike_outcomes(profile, armor_defense)
+        strike_count = profile[2]
+    else:
+        outcomes = strike_outcomes(profile, spell_defense)
+        strike_count = 1
+    negative_damage = any(
+        min(damage_pmf) < 0
+        for probability, damage_pmfs in outcomes
+        for damage_pmf in damage_pmfs
+    )
+
+    if damage_reduction <= 0 or not negative_damage:
+        strike_pmf = distribution.mixture([
+            (probability, sum_pmfs(damage_pmfs))
+            for probability, damage_pmfs in outcomes
+        ])
+        pmf = distribution.convolve_power(strike_pmf, strike_count)
+        if damage_reduction > 0:
+            # without negative damage, reduction only depends on the round's total
+            pmf = distribution.transform(pmf, lambda d: max(0, d - damage_reduction))
+    else:
+        # negative damage increases the available damage reduction,
+        # so each take_damage call has to be applied in order
+        states = {(damage_reduction, 0): 1.0}
+        for i in range(strike_count):
+            new_states = dict()
+            for probability, damage_pmfs in outcomes:
+                if probability == 0:
+                    continue
+                outcome_states = states
+                for damage_pmf in damage_pmfs:
+                    outcome_states = _take_damage(outcome_states, damage_pmf)
+                for state, state_probability in outcome_states.items():
+                    new_states[state] = new_states.get(state, 0) + probability * state_probability
+            states = new_states
+        pmf = distribution.transform(states, lambda state: state[1])
+    return _round_damage_pmfs.setdefault(key, pmf)
+
+
+def sum_pmfs(pmfs):
+    """Return the PMF of the sum of independent values"""
+    result = {0: 1.0}
+    for pmf in pmfs:
+        result = distribution.convolve(result, pmf)
+    return result
+
+
+def damage_per_round_table(attacker_names, defender_name, levels):
+    """Calculate the average damage sample creatures deal to a defender
+    in a round, at each level
+
+    Args:
+        attacker_names (list): names of sample creatures that attack
+        defender_name (str): name of the sample creature that is attacked
+        levels (list): levels of every creature
+
+    Yields:
+        dict: {<level>: {<attacker name>: <average damage>}}, as for format_level_table
+    """
+    table = dict()
+    for level in levels:
+        defender = Creature.from_sample_creature(defender_name, level=level)
+        table[level] = {
+            name: round(distribution.mean(round_damage_pmf(
+                Creature.from_sample_creature(name, level=level), defender
+            )), 2)
+            for name in attacker_names
+        }
+    return table
+
+
+def survival_probabilities(round_pmf, hit_points, rounds=MAX_COMBAT_ROUNDS):
+    """Return the chance that a creature is still alive after each round
+    of taking damage, applying the zero threshold as Creature.refresh_round does.
+    States less likely than NEGLIGIBLE_PROBABILITY are dropped, which
+    changes the results by far less than the precision they are reported to.
+
+    Args:
+        round_pmf (dict): PMF of the damage taken each round
+        hit_points (int): the creature's maximum hit points
+        rounds (int): number of rounds to calculate
+
+    Yields:
+        list: [<chance of being alive after 0 rounds>, <after 1 round>, ...]
+    """
+    damage_values = sorted(round_pmf)
+    if damage_values[0] >= 0 and hit_points > 0:
+        return _survival_probabilities_without_healing(round_pmf, hit_points, rounds)
+    damage_probabilities = [round_pmf[damage] for damage in damage_values]
+    cumulative_probabilities = list(accumulate(damage_probabilities))
+
+    def chance_between(low, high):
+        """Chance that the damage is from low to high, inclusive"""
+        low_index = bisect_left(damage_values, low)
+        high_index = bisect_right(damage_values, high)
+        if high_index <= low_index:
+            return 0
+        return (
+            cumulative_probabilities[high_index - 1]
+            - (cumulative_probabilities[low_index - 1] if low_index else 0)
+        )
+
+    no_damage_chance = round_pmf.get(0, 0)
+    # {<damage taken>: <probability>} while the creature is above 0 hit points
+    above_zero = {0: 1.0}
+    # chance of being at exactly 0 hit points without the zero threshold
+    at_zero = 0.0
+    alive = [1.0]
+    for r in range(rounds):
+        new_above_zero = dict()
+        new_at_zero = at_zero * no_damage_chance
+        if at_zero:
+            # healing from 0 hit points
+            for damage, damage_probability in zip(damage_values, damage_probabilities):
+                if damage >= 0:
+                    break
+                taken = hit_points + damage
+                new_above_zero[taken] = new_above_zero.get(taken, 0) + at_zero * damage_probability
+        for taken, probability in above_zero.items():
+            if probability < NEGLIGIBLE_PROBABILITY:
+                continue
+            # less damage than this keeps the creature above 0 hit points
+            limit = hit_points - taken
+            for damage, damage_probability in zip(damage_values, damage_probabilities):
+                if damage >= limit:
+                    break
+                total = taken + damage
+                new_above_zero[total] = new_above_zero.get(total, 0) + probability * damage_probability
+            # the zero threshold stops the creature at exactly 0 hit points
+            # unless it takes more than its maximum hit points in one round
+            new_at_zero += probability * chance_between(limit, max(limit, hit_points))
+        above_zero = new_above_zero
+        at_zero = new_at_zero
+        alive.append(sum(above_zero.values()) + at_zero)
+    return alive
+
+
+def _survival_probabilities_without_healing(round_pmf, hit_points, rounds):
+    """survival_probabilities for damage that is never negative.
+    Damage taken can only grow, so the chances of having taken each amount
+    of damage are stored in a list, and only the range of amounts that
+    are not negligible is updated each round."""
+    damages = sorted(
+        (damage, probability) for damage, probability in round_pmf.items()
+        if damage < hit_points
+    )
+    # at_least[i] is the chance of taking at least i damage in a round
+    at_least = [0.0] * (hit_points + 2)
+    for damage, probability in round_pmf.items():
+        at_least[min(damage, hit_points + 1)] += probability
+    for i in range(hit_points, -1, -1):
+        at_least[i] += at_least[i + 1]
+    # chance of stopping at exactly 0 hit points from each amount of
+    # damage taken: enough damage to reach 0, but no more than the maximum
+    zero_chances = [
+        at_least[hit_points - taken] - at_least[hit_points + 1]
+        for taken in range(hit_points)
+    ]
+    no_damage_chance = round_pmf.get(0, 0)
+    smallest_damage = damages[0][0] if damages else hit_points
+
+    # above_zero[<damage taken>] for the amounts from low to high, exclusive
+    above_zero = [0.0] * hit_points
+    above_zero[0] = 1.0
+    low, high = 0, 1
+    at_zero = 0.0
+    alive = [1.0]
+    for r in range(rounds):
+        new_above_zero = [0.0] * hit_points
+        for damage, probability in damages:
+            start = low + damage
+            if start >= hit_points:
+                break
+            end = min(high + damage, hit_points)
+            new_above_zero[start:end] = [
+                total + probability * previous
+                for total, previous in zip(new_above_zero[start:end], above_zero[low:end - damage])
+            ]
+        at_zero = at_zero * no_damage_chance + sum(
+            probability * zero_chance
+            for probability, zero_chance in zip(above_zero[low:high], zero_chances[low:high])
+        )
+        above_zero = new_above_zero
+        low, high = min(low + smallest_damage, hit_points), hit_points
+        while low < high and above_zero[low] < NEGLIGIBLE_PROBABILITY:
+            low += 1
+        while high > low and above_zero[high - 1] < NEGLIGIBLE_PROBABILITY:
+            high -= 1
+        alive.append(sum(above_zero[low:high]) + at_zero)
+    return alive
+
+
+def combat_rounds_pmf(red, blue, rounds=MAX_COMBAT_ROUNDS):
+    """Return the exact PMF of the number of rounds run_combat runs between
+    two creatures. Neither creature may have end of round effects.
+
+    The creatures' hit points change independently of each other, so the
+    chance that both are alive after a round is the product of each
+    creature's chance of being alive.
+
+    Args:
+        red (Creature)
+        blue (Creature)
+        rounds (int): the most rounds a combat can last
+
+    Yields:
+        dict: {<rounds>: <probability>}
+    """
+    for creature in [red, blue]:
+        if creature.end_of_round_effects:
+            raise Exception(
+                "Error: creature '{0}' has end of round effects, which cannot be calculated exactly".format(
+                    creature.name
+                )
+            )
+    red_alive = survival_probabilities(round_damage_pmf(blue, red), red.hit_points, rounds)
+    blue_alive = survival_probabilities(round_damage_pmf(red, blue), blue.hit_points, rounds)
+    both_alive = [r * b for r, b in zip(red_alive, blue_alive)]
+    pmf = {
+        r: both_alive[r - 1] - both_alive[r]
+        for r in range(1, rounds)
+        if both_alive[r - 1] - both_alive[r] > 0
+    }
+    if both_alive[rounds - 1] > 0:
+        pmf[rounds] = both_alive[rounds - 1]
+    return pmf
+
+
+def percentile(pmf, fraction):
+    """Return the smallest value with at least the given fraction of the
+    probability at or below it"""
+    total = 0
+    for value in sorted(pmf):
+        total += pmf[value]
+        # allow for floating point error in the total
+        if total >= fraction - 1e-12:
+            return value
+    return max(pmf)
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Calculate exact damage per round between Rise creatures',
+    )
+    parser.add_argument(
+        '-a', '--attackers',
+        dest='attackers',
+        help='creatures that attack',
+        nargs='+',
+        required=True,
+        type=str,
+    )
+    parser.add_argument(
+        '-d', '--defender',
+        default='dummy',
+        dest='defender',
+        help='the creature that is attacked',
+        type=str,
+    )
+    parser.add_argument(
+        '-l', '--levels',
+        default=list(range(1, 21)),
+        dest='levels',
+        help='the levels of the creatures',
+        nargs='+',
+        type=int,
+    )
+    return vars(parser.parse_args())
+
+
+def main(args):
+    print(format_level_table(damage_per_round_table(
+        args['attackers'],
+        args['defender'],
+        args['levels'],
+    )))
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_right
+import random
+
+# Probability mass functions (PMFs) are represented as dicts of
+# {<value>: <probability>}
+
+_dice_pmf_cache = dict()
+_dice_sampler_cache = dict()
+
+
+def convolve(pmf_a, pmf_b):
+    """Return the PMF of the sum of two independent values
+
+    Args:
+        pmf_a (dict)
+        pmf_b (dict)
+
+    Yields:
+        dict
+    """
+    result = dict()
+    for value_a, probability_a in pmf_a.items():
+        for value_b, probability_b in pmf_b.items():
+            value = value_a + value_b
+            result[value] = result.get(value, 0) + probability_a * probability_b
+    return result
+
+
+def convolve_power(pmf, count):
+    """Return the PMF of the sum of <count> independent copies of a value
+
+    Args:
+        pmf (dict)
+        count (int)
+
+    Yields:
+        dict
+    """
+    result = {0: 1.0}
+    # exponentiation by squaring keeps large dice pools cheap
+    while count > 0:
+        if count & 1:
+            result = convolve(result, pmf)
+        count >>= 1
+        if count:
+            pmf = convolve(pmf, pmf)
+    return result
+
+
+def add_constant(pmf, constant):
+    return {value + constant: probability for value, probability in pmf.items()}
+
+
+def transform(pmf, function):
+    """Return the PMF of function(value)"""
+    result = dict()
+    for value, probability in pmf.items():
+        new_value = function(value)
+        result[new_value] = result.get(new_value, 0) + probability
+    return result
+
+
+def mixture(weighted_pmfs):
+    """Return the PMF of a value drawn from one of several PMFs
+
+    Args:
+        weighted_pmfs (list): [(<weight>, <pmf>), ...]
+
+    Yields:
+        dict
+    """
+    result = dict()
+    for weight, pmf in weighted_pmfs:
+        if weight == 0:
+            continue
+        for value, probability in pmf.items():
+            result[value] = result.get(value, 0) + weight * probability
+    return result
+
+
+def die_pmf(size, count=1):
+    """Return the PMF of rolling <count> dice of the given size.
+    Results are cached, since the same dice are rolled constantly.
+    """
+    key = (size, count)
+    try:
+        return _dice_pmf_cache[key]
+    except KeyError:
+        single_die = {face: 1.0 / size for face in range(1, size + 1)}
+        return _dice_pmf_cache.setdefault(key, convolve_power(single_die, int(count)))
+
+
+def dice_pmf(dice):
+    """Return the PMF of rolling a Die or DieCollection
+
+    Args:
+        dice (Die or DieCollection)
+
+    Yields:
+        dict
+    """
+    result = {0: 1.0}
+    for die in getattr(dice, 'dice', [dice]):
+        result = convolve(result, die_pmf(die.size, die.count))
+    return result
+
+
+def mean(pmf):
+    return sum(value * probability for value, probability in pmf.items())
+
+
+class Sampler(object):
+    """Draw values from a PMF with a single random number per draw"""
+
+    def __init__(self, pmf):
+        self.values = sorted(pmf.keys())
+        self.cumulative_probabilities = list()
+        total = 0
+        for value in self.values:
+            total += pmf[value]
+            self.cumulative_probabilities.append(total)
+        self.total = total
+        self.minimum = self.values[0]
+
+    def sample(self):
+        index = bisect_right(self.cumulative_probabilities, random.random() * self.total)
+        # guard against floating point error at the top of the range
+        return self.values[min(index, len(self.values) - 1)]
+
+
+def dice_sampler(dice):
+    """Return a Sampler for the total of a Die or DieCollection, so any
+    number of dice can be rolled with a single random number.
+    Samplers are cached by the dice rolled.
+
+    Args:
+        dice (Die or DieCollection)
+
+    Yields:
+        Sampler
+    """
+    key = tuple((die.size, die.count) for die in getattr(dice, 'dice', [dice]))
+    try:
+        return _dice_sampler_cache[key]
+    except KeyError:
+        return _dice_sampler_cache.setdefault(key, Sampler(dice_pmf(dice)))
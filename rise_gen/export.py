@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import sys
+from rise_gen.combat import create_combat_pool
+from rise_gen.creature import Creature, STAT_BLOCK_STATISTICS, stat_block_value
+
+
+def export_sample_creature(export_args):
+    """Calculate the stat blocks of a single sample creature at every given level.
+    A single prototype creature is built and re-levelled for each level.
+
+    Args:
+        export_args (tuple): (sample name, list of levels)
+
+    Yields:
+        tuple: (sample name, list of stat block dicts, error message or None)
+    """
+    sample_name, levels = export_args
+    try:
+        prototype = Creature.from_sample_creature(sample_name, level=levels[0])
+        table = prototype.level_table(levels, STAT_BLOCK_STATISTICS)
+        stat_blocks = list()
+        for level in levels:
+            stat_block = {
+                'name': sample_name,
+                'level': level,
+            }
+            for statistic in STAT_BLOCK_STATISTICS:
+                stat_block[statistic] = stat_block_value(table[level][statistic])
+            stat_blocks.append(stat_block)
+        return sample_name, stat_blocks, None
+    except Exception as e:
+        return sample_name, list(), str(e)
+
+
+def generate_stat_blocks(sample_names, levels, workers=None):
+    """Yield (sample name, stat blocks, error) for every sample creature.
+    Results are yielded in the order of sample_names as soon as they are ready.
+
+    Args:
+        sample_names (list): names of sample creatures to export
+        levels (list): levels to export each creature at
+        workers (int): number of worker processes; None or 1 to run serially
+    """
+    export_args = [(sample_name, list(levels)) for sample_name in sample_names]
+    if workers is None or workers <= 1:
+        for result in map(export_sample_creature, export_args):
+            yield result
+    else:
+        with create_combat_pool(workers) as pool:
+            for result in pool.imap(export_sample_creature, export_args):
+                yield result
+
+
+def write_stat_blocks(results, output_file, output_format):
+    """Stream stat blocks to a file as they are generated
+
+    Args:
+        results (iterable): output of generate_stat_blocks
+        output_file (file): file to write to
+        output_format (str): 'csv' or 'jsonl'
+
+    Yields:
+        int: the number of stat blocks written
+    """
+    if output_format == 'csv':
+        writer = csv.DictWriter(output_file, ['name', 'level'] + STAT_BLOCK_STATISTICS)
+        writer.writeheader()
+        write_row = writer.writerow
+    elif output_format == 'jsonl':
+        def write_row(stat_block):
+            output_file.write(json.dumps(stat_block) + '\n')
+    else:
+        raise Exception("Error: invalid output format '{0}'".format(output_format))
+
+    count = 0
+    for sample_name, stat_blocks, error in results:
+        if error is not None:
+            print("Warning: unable to export '{0}': {1}".format(sample_name, error),
+                  file=sys.stderr)
+        for stat_block in stat_blocks:
+            write_row(stat_block)
+            count += 1
+    return count
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Export stat blocks for every Rise sample creature and monster',
+    )
+    parser.add_argument(
+        '-f', '--format',
+        choices=['csv', 'jsonl'],
+        default='jsonl',
+        dest='format',
+        help='the output format',
+    )
+    parser.add_argument(
+        '--max-level',
+        default=20,
+        dest='max_level',
+        help='the highest level to export',
+        type=int,
+    )
+    parser.add_argument(
+        '--min-level',
+        default=1,
+        dest='min_level',
+        help='the lowest level to export',
+        type=int,
+    )
+    parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        help='file to write to instead of stdout',
+        type=str,
+    )
+    parser.add_argument(
+        '-s', '--sample',
+        dest='sample_creatures',
+        help='only export the given sample creatures',
+        nargs='+',
+        type=str,
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        default=1,
+        dest='workers',
+        help='the number of worker processes to use',
+        type=int,
+    )
+    return vars(parser.parse_args())
+
+
+def main(args):
+    sample_names = args['sample_creatures'] or sorted(Creature.load_sample_creatures().keys())
+    results = generate_stat_blocks(
+        sample_names,
+        range(args['min_level'], args['max_level'] + 1),
+        workers=args['workers'],
+    )
+    if args['output']:
+        with open(args['output'], 'w', newline='') as output_file:
+            write_stat_blocks(results, output_file, args['format'])
+    else:
+        write_stat_blocks(results, sys.stdout, args['format'])
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
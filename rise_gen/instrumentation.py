@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+from collections import defaultdict
+from contextlib import contextmanager
+import time
+from rise_gen.dice import Die
+from rise_gen.util import Patches
+
+# Instrumentation works by replacing methods with counting wrappers while it
+# is enabled, and restoring the originals when it is disabled. The hot paths
+# contain no instrumentation checks, so it costs nothing while disabled.
+
+_enabled = False
+# objects with start_phase(name) and end_phase(name) methods, such as profilers
+_phase_listeners = list()
+_patches = Patches()
+
+property_accesses = defaultdict(int)
+property_misses = defaultdict(int)
+property_miss_time = defaultdict(float)
+effect_scans = defaultdict(int)
+effects_scanned = defaultdict(int)
+effects_matched = defaultdict(int)
+effect_scan_time = defaultdict(float)
+phase_time = defaultdict(float)
+counts = defaultdict(int)
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget everything counted so far"""
+    for counter in [property_accesses, property_misses, property_miss_time,
+                    effect_scans, effects_scanned, effects_matched,
+                    effect_scan_time, phase_time, counts]:
+        counter.clear()
+
+
+def _instrument_cached_property(creature_class, property_name):
+    calculate = getattr(creature_class, property_name).fget
+
+    def get_cached_property(creature):
+        property_accesses[property_name] += 1
+        if property_name in creature._cache:
+            return creature._cache[property_name]
+        property_misses[property_name] += 1
+        start = time.perf_counter()
+        try:
+            return calculate(creature)
+        finally:
+            property_miss_time[property_name] += time.perf_counter() - start
+    _patches.patch(creature_class, property_name, property(get_cached_property))
+
+
+def _instrument_effect_scans(creature_class):
+    active_effects_with_tag = creature_class.active_effects_with_tag
+
+    def counted_active_effects_with_tag(creature, effect_tag):
+        start = time.perf_counter()
+        effects = active_effects_with_tag(creature, effect_tag)
+        effect_scan_time[effect_tag] += time.perf_counter() - start
+        effect_scans[effect_tag] += 1
+        effects_scanned[effect_tag] += sum(len(ability.effects) for ability in creature.abilities)
+        effects_matched[effect_tag] += len(effects)
+        return effects
+    _patches.patch(creature_class, 'active_effects_with_tag', counted_active_effects_with_tag)
+
+
+def _instrument_dice():
+    roll = Die.roll
+
+    def counted_roll(die):
+        counts['die rolls'] += 1
+        return roll(die)
+    _patches.patch(Die, 'roll', counted_roll)
+
+
+def enable(creature_class):
+    """Start counting cache misses, effect scans, and die rolls
+
+    Args:
+        creature_class (class): the Creature class to instrument. This is
+            passed in rather than imported so that instrumenting works when
+            creature.py is run as a script.
+    """
+    global _enabled
+    if _enabled:
+        return
+    for property_name in creature_class.cached_property_names:
+        _instrument_cached_property(creature_class, property_name)
+    _instrument_effect_scans(creature_class)
+    _instrument_dice()
+    _enabled = True
+
+
+def disable():
+    """Stop counting and restore the original methods"""
+    global _enabled
+    _patches.restore()
+    _enabled = False
+
+
+def count(name, amount=1):
+    """Add to a named counter, such as the number of trials run"""
+    if _enabled:
+        counts[name] += amount
+
+
+def add_phase_listener(listener):
+    _phase_listeners.append(listener)
+
+
+def remove_phase_listener(listener):
+    _phase_listeners.remove(listener)
+
+
+@contextmanager
+def phase(name):
+    """Time a phase of work, such as constructing creatures or running trials,
+    and tell any phase listeners about it.
+    This is meant for coarse phases, so it is always safe to call."""
+    if not _enabled and not _phase_listeners:
+        yield
+        return
+    for listener in _phase_listeners:
+        listener.start_phase(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _enabled:
+            phase_time[name] += time.perf_counter() - start
+        for listener in _phase_listeners:
+            listener.end_phase(name)
+
+
+def format_report():
+    """Format everything counted so far as text"""
+    lines = ['phases:']
+    for name in sorted(phase_time, key=phase_time.get, reverse=True):
+        lines.append('  {0}: {1:.3f} s'.format(name, phase_time[name]))
+
+    lines.append('counts:')
+    for name in sorted(counts):
+        lines.append('  {0}: {1}'.format(name, counts[name]))
+    if counts['trials']:
+        lines.append('  die rolls per trial: {0:.1f}'.format(
+            counts['die rolls'] / float(counts['trials'])
+        ))
+
+    total_accesses = sum(property_accesses.values())
+    total_misses = sum(property_misses.values())
+    lines.append('cached properties: {0} accesses, {1} misses ({2:.1%})'.format(
+        total_accesses,
+        total_misses,
+        total_misses / float(total_accesses) if total_accesses else 0,
+    ))
+    for name in sorted(property_miss_time, key=property_miss_time.get, reverse=True):
+        lines.append('  {0}: {1} accesses, {2} misses, {3:.4f} s calculating'.format(
+            name, property_accesses[name], property_misses[name], property_miss_time[name],
+        ))
+
+    lines.append('effect scans:')
+    for tag in sorted(effect_scan_time, key=effect_scan_time.get, reverse=True):
+        lines.append('  {0}: {1} scans, {2:.1f} effects scanned and {3:.1f} matched per scan, {4:.4f} s'.format(
+            tag,
+            effect_scans[tag],
+            effects_scanned[tag] / float(effect_scans[tag]),
+            effects_matched[tag] / float(effect_scans[tag]),
+            effect_scan_time[tag],
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+import rise_gen.util as util
+
+
+class LevelCache(object):
+    """Levels of previously levelled entries, keyed by the content hash of
+    each entry's resolved definition. Since $ref inheritance is resolved
+    before hashing, editing a template changes the hash of every entry
+    that inherits from it.
+    """
+
+    def __init__(self, file_name=None, context=None):
+        """
+        Args:
+            file_name (str): JSON file to persist the cache in.
+                If None, the cache only lasts as long as this object.
+            context (varies): anything else that affects every entry's level,
+                such as the modifier tables. If it changes, the cache is discarded.
+        """
+        self.file_name = file_name
+        self.context_hash = util.content_hash(context)
+        self.entries = dict()
+        if file_name is not None and os.path.exists(file_name):
+            with open(file_name, 'r') as cache_file:
+                data = json.load(cache_file)
+            if data.get('context') == self.context_hash:
+                self.entries = data['entries']
+
+    def get(self, name, entry_hash):
+        """Return the cached level of an entry, or None if it changed"""
+        entry = self.entries.get(name)
+        if entry is not None and entry['hash'] == entry_hash:
+            return entry['level']
+        return None
+
+    def save(self):
+        if self.file_name is None:
+            return
+        directory = os.path.dirname(self.file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.file_name, 'w') as cache_file:
+            json.dump({
+                'context': self.context_hash,
+                'entries': self.entries,
+            }, cache_file, sort_keys=True)
+
+
+def incremental_levels(entries, cache, level_entries):
+    """Level only the entries whose resolved definitions changed since the
+    cache was last updated, and update the cache
+
+    Args:
+        entries (dict): {<name>: <resolved properties>}
+        cache (LevelCache)
+        level_entries (function): given {<name>: <properties>} for the changed
+            entries, return {<name>: <level>}. Entries that fail to level
+            should be left out.
+
+    Yields:
+        list: [(<name>, <old level>, <new level>), ...] for every entry
+            whose level changed, including added and removed entries
+    """
+    # hash before levelling, since levellers add default properties in place
+    entry_hashes = {name: util.content_hash(entries[name]) for name in entries}
+    changed_entries = {
+        name: entries[name] for name in entries
+        if cache.get(name, entry_hashes[name]) is None
+    }
+    new_levels = level_entries(changed_entries) if changed_entries else dict()
+
+    diffs = list()
+    for name in sorted(set(cache.entries) | set(entries)):
+        old_level = cache.entries[name]['level'] if name in cache.entries else None
+        if name not in entries:
+            del cache.entries[name]
+            diffs.append((name, old_level, None))
+        elif name in changed_entries:
+            new_level = new_levels.get(name)
+            if new_level is None:
+                cache.entries.pop(name, None)
+            else:
+                cache.entries[name] = {
+                    'hash': entry_hashes[name],
+                    'level': new_level,
+                }
+            if new_level != old_level:
+                diffs.append((name, old_level, new_level))
+    cache.save()
+    return diffs
+
+
+def print_level_diffs(diffs):
+    for name, old_level, new_level in diffs:
+        print("{}: {} -> {}".format(name, old_level, new_level))
+
+
+def watch(file_names, on_change, interval=1.0):
+    """Call on_change() immediately and then whenever any of the given
+    files is modified. Runs until interrupted.
+
+    Args:
+        file_names (list): files to watch
+        on_change (function): called with no arguments
+        interval (float): seconds between checks for modifications
+    """
+    last_modified = None
+    while True:
+        modified = [os.path.getmtime(file_name) for file_name in file_names]
+        if modified != last_modified:
+            last_modified = modified
+            on_change()
+        time.sleep(interval)
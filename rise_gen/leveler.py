@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
+import rise_gen.util as util
 import yaml
 
 class Leveler:
@@ -10,6 +12,9 @@ class Leveler:
     recursive_properties = list()
     required_properties = list()
 
+    # {<property name>: <modifier function>}, compiled by import_config
+    modifier_functions = dict()
+
     @classmethod
     def import_config(cls, file_name):
         with open(file_name, 'r') as config_file:
@@ -28,10 +33,31 @@ class Leveler:
         for property_name in cls.possible_properties:
             create_leveler_property(property_name)
 
+        # these are only used for membership tests
+        cls.meta_properties = frozenset(cls.meta_properties)
+        cls.possible_properties = frozenset(cls.possible_properties)
+        cls.recursive_properties = frozenset(cls.recursive_properties)
+
+        # compile the modifier functions so level() does no string work
+        cls.modifier_functions = dict()
+        for property_name in cls.possible_properties:
+            modifier_function = getattr(cls, cls.modifier_function_name(property_name), None)
+            if modifier_function is not None:
+                cls.modifier_functions[property_name] = modifier_function
+
+    @staticmethod
+    def modifier_function_name(property_name):
+        return "_{0}_modifier".format(
+            property_name.replace(' ', '_')
+        )
+
+    # if false, warnings are only recorded in self.warnings
+    print_warnings = True
 
     def __init__(self, name, properties):
         self.name = name
         self.properties = properties
+        self.warnings = list()
 
         self._init_default_properties()
         self._init_derived_properties()
@@ -56,10 +82,11 @@ class Leveler:
         Yields:
             int
         """
-        modifier_function_name = "_{0}_modifier".format(
-            property_name.replace(' ', '_')
-        )
-        return getattr(self, modifier_function_name)()
+        modifier_function = type(self).modifier_functions.get(property_name)
+        if modifier_function is None:
+            # unrecognized properties fail here just as they always have
+            return getattr(self, self.modifier_function_name(property_name))()
+        return modifier_function(self)
 
     def validate(self):
         """Check for invalid properties, and warn or die appropriately"""
@@ -89,51 +116,112 @@ class Leveler:
         ))
 
     def warn(self, message):
-        """Print a warning that includes the name and properties of this leveler"""
-        print("Warning: {0} {1}".format(
+        """Record and print a warning that includes the name of this leveler"""
+        warning = "Warning: {0} {1}".format(
             self,
             message
-        ))
+        )
+        self.warnings.append(warning)
+        if self.print_warnings:
+            print(warning)
 
-    def level(self):
+    def level(self, breakdown=False):
         """Return the raw level of this object.
-        This calls all calculation functions relevant to the object's properties"""
+        This calls all calculation functions relevant to the object's properties.
+        If breakdown is true, return a LevelBreakdown of every property's
+        contribution instead, collected in the same pass."""
+        if breakdown:
+            return self._level_breakdown()
+
         level = 0
+        meta_properties = type(self).meta_properties
+        modifier_functions = type(self).modifier_functions
 
         # call all the calculation functions
-
-        for property_name in self.properties:
-            if (property_name not in type(self).meta_properties
-                    and self.properties[property_name] is not None):
+        for property_name, value in self.properties.items():
+            if value is None or property_name in meta_properties:
+                continue
+            modifier_function = modifier_functions.get(property_name)
+            if modifier_function is None:
                 level += self.get_modifier(property_name)
+            else:
+                level += modifier_function(self)
 
         return level
 
+    def _level_breakdown(self):
+        result = LevelBreakdown()
+        meta_properties = type(self).meta_properties
+        try:
+            for property_name, value in self.properties.items():
+                if value is None or property_name in meta_properties:
+                    continue
+                # nested_level records the nested breakdowns it uses here
+                self._nested_collector = list()
+                modifier = self.get_modifier(property_name)
+                result.add(property_name, modifier, self._nested_collector)
+        finally:
+            self._nested_collector = None
+        return result
+
     def explain_level(self):
         """Print debugging information that explains this object's level"""
+        breakdown = self.level(breakdown=True)
         print(self)
-        for property_name in self.properties:
+        for contribution in breakdown.contributions:
+            property_name = contribution.property_name
             # only explain non-default properties
             if (property_name in type(self).default_properties
                     and self.properties[property_name] == type(self).default_properties[property_name]):
                 continue
             print("    {0}: {1}".format(
                 property_name,
-                self.get_modifier(property_name),
+                contribution.modifier,
             ))
 
-            # recursive properties should be explained individually
-            if property_name in type(self).recursive_properties:
-                for properties in self.properties[property_name]:
-                    nested_leveler = self.create_nested(properties)
-                    print("        nested: {0}".format(
-                        nested_leveler.level()
-                    ))
-        print("total:", self.level())
+            # nested abilities should be explained individually
+            for nested_breakdown in contribution.nested:
+                print("        nested: {0}".format(
+                    nested_breakdown.total
+                ))
+        print("total:", breakdown.total)
 
     def __str__(self):
         return "Leveler('{0}')".format(self.name)
 
+    # breakdowns of nested levelers, keyed by leveler type and canonical properties
+    _nested_breakdowns = dict()
+
+    # while calculating a breakdown, the nested breakdowns used by the
+    # current property
+    _nested_collector = None
+
+    @classmethod
+    def clear_nested_levels(cls):
+        """Forget all memoized nested levels, such as after content changes"""
+        Leveler._nested_breakdowns.clear()
+
+    def nested_level(self, properties):
+        """Return the level of a nested leveler with the given properties.
+        Structurally identical properties are only levelled once per run.
+
+        Args:
+            properties (dict)
+
+        Yields:
+            int
+        """
+        key = (type(self), util.canonical_key(properties))
+        try:
+            breakdown = Leveler._nested_breakdowns[key]
+        except KeyError:
+            # copy the properties so creating the leveler does not change the key
+            breakdown = self.create_nested(dict(properties)).level(breakdown=True)
+            Leveler._nested_breakdowns[key] = breakdown
+        if self._nested_collector is not None:
+            self._nested_collector.append(breakdown)
+        return breakdown.total
+
     def create_nested(self, properties):
         """Create a new leveler with the given properties
         The name of the leveler is based on this leveler's name
@@ -145,3 +233,38 @@ class Leveler:
             Leveler
         """
         return type(self)(self.name + '**nested', properties)
+
+
+LevelContribution = namedtuple('LevelContribution', ['property_name', 'modifier', 'nested'])
+
+
+class LevelBreakdown(object):
+    """The contribution of each property to a leveler's level,
+    including the breakdowns of any nested levelers.
+    Nested breakdowns are shared between identical nested levelers."""
+
+    def __init__(self):
+        self.contributions = list()
+        self.total = 0
+
+    def add(self, property_name, modifier, nested=None):
+        self.contributions.append(LevelContribution(property_name, modifier, nested or list()))
+        self.total += modifier
+
+    def as_dict(self):
+        """Return the breakdown as plain data
+
+        Yields:
+            dict: {'total', 'contributions': [{'property', 'modifier', 'nested'}]}
+        """
+        return {
+            'total': self.total,
+            'contributions': [
+                {
+                    'property': contribution.property_name,
+                    'modifier': contribution.modifier,
+                    'nested': [nested.as_dict() for nested in contribution.nested],
+                }
+                for contribution in self.contributions
+            ],
+        }
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 from docopt import docopt
+from multiprocessing import Pool
 from rise_gen.ability import Ability
+import rise_gen.level_cache as level_cache
 from rise_gen.leveler import Leveler
 import rise_gen.util as util
 
@@ -10,8 +12,13 @@ Usage:
     monster_leveler [options]
 
 Options:
-    -h, --help      Show this screen and exit
-    -v, --verbose   Show more output
+    -c, --cache <file>     Only re-level monsters that changed since they
+                           were cached in this file, and show level changes
+    -h, --help             Show this screen and exit
+    -i, --interval <sec>   Seconds between checks in watch mode [default: 1]
+    -v, --verbose          Show more output
+    -w, --workers <count>  Level monsters across this many processes
+    --watch                Re-level changed monsters whenever the file changes
 """
 
 RAW_MODIFIERS = util.import_yaml_file('content/monster_modifiers.yaml')
@@ -20,6 +27,9 @@ class MonsterLeveler(Leveler):
 
     monsters = None
 
+    # {<content hash of a monster's properties>: <effective level>}
+    effective_levels = dict()
+
     def _attributes_modifier(self):
         """We don't care about the names - just the values"""
         modifier = 0
@@ -77,8 +87,7 @@ class MonsterLeveler(Leveler):
     def _traits_modifier(self):
         modifier = 0
         for trait_name in self.traits:
-            ability = Ability.by_name(trait_name)
-            modifier += RAW_MODIFIERS['traits'][ability.power]
+            modifier += RAW_MODIFIERS['traits'][Ability.power_by_name(trait_name)]
         return modifier
 
     def _weapons_modifier(self):
@@ -93,14 +102,55 @@ class MonsterLeveler(Leveler):
         if cls.monsters is None:
             cls.monsters = util.import_yaml_file('content/monsters.yaml')
         return cls(name, cls.monsters[name])
+
+    @classmethod
+    def cached_effective_level(cls, name, properties):
+        """Return the effective level of a monster with the given properties.
+        Levels are cached by the content of the properties, so a monster is
+        only levelled once per run no matter how often it is created."""
+        key = util.content_hash(properties)
+        try:
+            return cls.effective_levels[key]
+        except KeyError:
+            # copy the properties so levelling does not change the key
+            level = cls(name, dict(properties)).effective_level()
+            cls.effective_levels[key] = level
+            return level
+
+    @classmethod
+    def effective_level_by_monster_name(cls, name):
+        """Return the cached effective level of a monster from its name"""
+        if cls.monsters is None:
+            cls.monsters = util.import_yaml_file('content/monsters.yaml')
+        return cls.cached_effective_level(name, cls.monsters[name])
 MonsterLeveler.import_config('content/monster_leveler_config.yaml')
 
 
-def calculate_monster_levels(data):
-    levels = dict()
+def _level_monster(monster_args):
+    name, properties = monster_args
+    return name, MonsterLeveler.cached_effective_level(name, properties)
+
+def calculate_monster_levels(data, workers=None):
+    """Calculate the effective level of every monster, optionally across a process pool
+
+    Args:
+        data (dict): {<name>: <properties>}
+        workers (int): number of worker processes; None or 1 to run serially
+
+    Yields:
+        dict: {<name>: <effective level>}
+    """
+    monster_args = [(name, data[name]) for name in data]
+    if workers is None or workers <= 1:
+        return dict(map(_level_monster, monster_args))
+
+    # make sure the trait powers are shared with every worker
+    Ability.power_by_name('magic items')
+    with Pool(workers) as pool:
+        levels = dict(pool.map(_level_monster, monster_args))
+    # remember the workers' results in this process as well
     for name in data:
-        monster = MonsterLeveler(name, data[name])
-        levels[name] = monster.effective_level()
+        MonsterLeveler.effective_levels[util.content_hash(data[name])] = levels[name]
     return levels
 
 
@@ -117,9 +167,51 @@ def default_land_speed(size):
         'colossal': 70,
     }[size]
 
+def incremental_monster_levels(file_name, cache):
+    """Re-level only the monsters in the given file whose resolved
+    definitions changed since they were last cached
+
+    Yields:
+        list: level diffs from level_cache.incremental_levels
+    """
+    def level_changed_monsters(changed_monsters):
+        levels = dict()
+        for name in changed_monsters:
+            try:
+                levels[name] = MonsterLeveler(name, changed_monsters[name]).effective_level()
+            except Exception as e:
+                print("Error: {}: {}".format(name, e))
+        return levels
+
+    return level_cache.incremental_levels(
+        util.import_yaml_file(file_name),
+        cache,
+        level_changed_monsters,
+    )
+
 def main(args):
-    data = util.import_yaml_file('content/monsters.yaml')
-    monster_levels = calculate_monster_levels(data)
+    file_name = 'content/monsters.yaml'
+
+    if args['--cache'] or args['--watch']:
+        cache = level_cache.LevelCache(args['--cache'], context={
+            'modifiers': RAW_MODIFIERS,
+        })
+
+        def update():
+            level_cache.print_level_diffs(incremental_monster_levels(file_name, cache))
+
+        if args['--watch']:
+            try:
+                level_cache.watch([file_name], update, float(args['--interval']))
+            except KeyboardInterrupt:
+                pass
+        else:
+            update()
+        return
+
+    workers = int(args['--workers']) if args['--workers'] else None
+    data = util.import_yaml_file(file_name)
+    monster_levels = calculate_monster_levels(data, workers)
     for monster_name in sorted(monster_levels.keys()):
         print("{}: {}".format(
             monster_name,
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+from collections import Counter, defaultdict
+import cProfile
+from contextlib import contextmanager
+import os
+import pstats
+import sys
+import threading
+import rise_gen.instrumentation as instrumentation
+
+
+def frame_label(code):
+    return '{0} ({1}:{2})'.format(
+        code.co_name,
+        os.path.basename(code.co_filename),
+        code.co_firstlineno,
+    )
+
+
+class StackSampler(threading.Thread):
+    """Periodically records the call stack of another thread.
+    Stacks are counted separately for each phase, and phases with no
+    phase set are not recorded.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.phase = None
+        # {<phase>: Counter({<folded stack>: <sample count>})}
+        self.stacks = defaultdict(Counter)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            phase = self.phase
+            if phase is None:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            labels = list()
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[phase][';'.join(reversed(labels))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler(object):
+    """Profiles each phase marked with instrumentation.phase separately,
+    so that setup such as creature construction does not drown out the
+    trials themselves. Each phase gets a cProfile profile and, if sampling
+    is enabled, a set of sampled call stacks for flame graphs.
+    """
+
+    def __init__(self, interval=0.001):
+        """
+        Args:
+            interval (float): seconds between stack samples; 0 to only use cProfile
+        """
+        self.interval = interval
+        self.profiles = dict()
+        self.sampler = None
+        self._original_switch_interval = None
+
+    def start(self):
+        if self.interval > 0:
+            self.sampler = StackSampler(threading.get_ident(), self.interval)
+            # the sampler can only run as often as the main thread releases the GIL
+            self._original_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self.interval, self._original_switch_interval))
+            self.sampler.start()
+        instrumentation.add_phase_listener(self)
+
+    def stop(self):
+        instrumentation.remove_phase_listener(self)
+        if self.sampler is not None:
+            self.sampler.stop()
+            sys.setswitchinterval(self._original_switch_interval)
+
+    def start_phase(self, name):
+        if name not in self.profiles:
+            self.profiles[name] = cProfile.Profile()
+        self.profiles[name].enable()
+        if self.sampler is not None:
+            self.sampler.phase = name
+
+    def end_phase(self, name):
+        if self.sampler is not None:
+            self.sampler.phase = None
+        self.profiles[name].disable()
+
+    def folded_stacks(self, name):
+        """Return the sampled stacks of a phase in the folded format used by
+        flame graph tools, with one '<frame>;<frame>;... <count>' line per stack"""
+        if self.sampler is None:
+            return ''
+        stacks = self.sampler.stacks[name]
+        return ''.join(
+            '{0} {1}\n'.format(stack, stacks[stack])
+            for stack in sorted(stacks)
+        )
+
+    def save(self, prefix):
+        """Write <prefix>.<phase>.pstats and <prefix>.<phase>.folded for each phase
+
+        Yields:
+            list: names of the files written
+        """
+        file_names = list()
+        for name in sorted(self.profiles):
+            file_name = '{0}.{1}.pstats'.format(prefix, name)
+            self.profiles[name].dump_stats(file_name)
+            file_names.append(file_name)
+            if self.sampler is not None:
+                file_name = '{0}.{1}.folded'.format(prefix, name)
+                with open(file_name, 'w') as folded_file:
+                    folded_file.write(self.folded_stacks(name))
+                file_names.append(file_name)
+        return file_names
+
+    def print_stats(self, sort_key, limit=20):
+        for name in sorted(self.profiles):
+            print('Profile of {0}:'.format(name))
+            pstats.Stats(self.profiles[name]).sort_stats(sort_key).print_stats(limit)
+
+
+@contextmanager
+def profiling(prefix, interval=0.001):
+    """Profile every phase run inside this context and save the results
+
+    Yields:
+        Profiler
+    """
+    profiler = Profiler(interval)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.save(prefix)
+
+
+# profile of the current worker process, accumulated across chunks of work
+_worker_profile = None
+
+
+@contextmanager
+def worker_profile(prefix):
+    """Profile work done in a worker process. Each process accumulates its own
+    profile and saves it to <prefix>.worker-<pid>.pstats after each chunk.
+    Does nothing if prefix is None."""
+    global _worker_profile
+    if prefix is None:
+        yield
+        return
+    if _worker_profile is None:
+        _worker_profile = cProfile.Profile()
+    _worker_profile.enable()
+    try:
+        yield
+    finally:
+        _worker_profile.disable()
+        _worker_profile.dump_stats('{0}.worker-{1}.pstats'.format(prefix, os.getpid()))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sqlite3
+import rise_gen.util as util
+
+# Increase this whenever the combat rules change in a way that the
+# creature fingerprints would not notice, such as Creature.strike or the
+# function of an ability effect changing.
+ENGINE_VERSION = 2
+
+
+class ResultCache(object):
+    """Totals of seeded combat trials, stored in SQLite.
+
+    Trials are run in chunks whose random state depends only on the seed and
+    the index of the chunk's first trial, so chunks can be stored separately.
+    Asking for more trials than were cached only runs the missing chunks.
+    Each chunk is stored with the random state after its last trial, so a
+    chunk that was cut short can be continued without running it again.
+    """
+
+    def __init__(self, file_name):
+        directory = os.path.dirname(file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(file_name)
+        with self.connection:
+            columns = [
+                row[1] for row in self.connection.execute('PRAGMA table_info(chunks)')
+            ]
+            if columns and 'random_state' not in columns:
+                # chunks from before random states were stored cannot be
+                # continued, so the old cache is discarded
+                self.connection.execute('DROP TABLE chunks')
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    key TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    trials INTEGER NOT NULL,
+                    red_alive INTEGER NOT NULL,
+                    blue_alive INTEGER NOT NULL,
+                    rounds INTEGER NOT NULL,
+                    random_state TEXT NOT NULL,
+                    PRIMARY KEY (key, start, trials)
+                )
+            """)
+
+    @staticmethod
+    def key(red, blue, seed, chunk_size):
+        return util.content_hash({
+            'engine version': ENGINE_VERSION,
+            'red': red.fingerprint(),
+            'blue': blue.fingerprint(),
+            'seed': seed,
+            'chunk size': chunk_size,
+        })
+
+    def get_chunks(self, key):
+        """Return every cached chunk for a key
+
+        Yields:
+            dict: {(<start>, <trials>): {'totals', 'random state'}}
+        """
+        rows = self.connection.execute(
+            'SELECT start, trials, red_alive, blue_alive, rounds, random_state FROM chunks WHERE key = ?',
+            (key,),
+        )
+        return {
+            (start, trials): {
+                'totals': {
+                    'trials': trials,
+                    'red is alive': red_alive,
+                    'blue is alive': blue_alive,
+                    'rounds': rounds,
+                },
+                'random state': decode_random_state(random_state),
+            }
+            for start, trials, red_alive, blue_alive, rounds, random_state in rows
+        }
+
+    @staticmethod
+    def longest_partial_chunk(cached_chunks, start, trials):
+        """Return the cached chunk with the most trials that starts at start
+        but has fewer than trials, or None if there is no such chunk
+
+        Args:
+            cached_chunks (dict): as from get_chunks
+            start (int): index of the chunk's first trial
+            trials (int): number of trials the chunk needs
+
+        Yields:
+            tuple: (<start>, <trials>)
+        """
+        partial_chunks = [
+            chunk for chunk in cached_chunks
+            if chunk[0] == start and chunk[1] < trials
+        ]
+        return max(partial_chunks, key=lambda chunk: chunk[1], default=None)
+
+    def add_chunks(self, key, chunks):
+        """Store totals for chunks
+
+        Args:
+            key (str): from ResultCache.key
+            chunks (dict): {(<start>, <trials>): {'totals', 'random state'}}
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (key, start, trials, chunk['totals']['red is alive'],
+                     chunk['totals']['blue is alive'], chunk['totals']['rounds'],
+                     encode_random_state(chunk['random state']))
+                    for (start, trials), chunk in chunks.items()
+                ],
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def encode_random_state(random_state):
+    """Convert a state from random.getstate into a string"""
+    version, internal_state, gauss_next = random_state
+    return json.dumps([version, internal_state, gauss_next])
+
+def decode_random_state(text):
+    """Convert a string from encode_random_state into a state for random.setstate"""
+    version, internal_state, gauss_next = json.loads(text)
+    return (version, tuple(internal_state), gauss_next)
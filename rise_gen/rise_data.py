@@ -30,7 +30,7 @@ class RiseData(object):
             cls.data = cls.init_data()
         relevant_data = cls.data.get(thing_name)
 
-        for key in relevant_data:
+        for key in list(relevant_data):
             python_friendly_key = key.replace(' ', '_')
             relevant_data[python_friendly_key] = relevant_data.pop(key)
 
@@ -185,6 +185,24 @@ class Weapon(RiseData):
             return yaml.load(weapons_file)
 
 
+# the highest level covered by the precomputed progression tables
+MAX_TABLE_LEVEL = 30
+
+# key is by starting value
+ATTRIBUTE_PROGRESSIONS = {
+    1: lambda level: level // 4 + 1,
+    2: lambda level: level // 2 + 2,
+    3: lambda level: (level * 3) // 4 + 3,
+    4: lambda level: level + 3,
+    5: lambda level: level + 4,
+}
+
+ATTRIBUTE_PROGRESSION_TABLE = {
+    progression: [calculate(level) for level in range(MAX_TABLE_LEVEL + 1)]
+    for progression, calculate in ATTRIBUTE_PROGRESSIONS.items()
+}
+
+
 def calculate_attribute_progression(progression, level):
     """Calculate an attribute's actual value based on level and progression
 
@@ -197,12 +215,14 @@ def calculate_attribute_progression(progression, level):
         <number>: the number
     """
 
-    # key is by starting value
-    return {
-        None: 0,
-        1: level // 4 + 1,
-        2: level // 2 + 2,
-        3: (level * 3) // 4 + 3,
-        4: level + 3,
-        5: level + 4
-    }.get(progression, progression) # if not in here, just use the given value
+    if progression is None:
+        return 0
+    try:
+        table = ATTRIBUTE_PROGRESSION_TABLE[progression]
+    except KeyError:
+        # if not in here, just use the given value
+        return progression
+    if 0 <= level <= MAX_TABLE_LEVEL:
+        return table[level]
+    else:
+        return ATTRIBUTE_PROGRESSIONS[progression](level)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+
+import argparse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+from rise_gen.ability_leveler import level_abilities
+from rise_gen.combat import (
+    add_combat_totals, create_combat_pool, sample_group,
+    simulate_combat_chunk, split_trials, summarize_combat_totals
+)
+from rise_gen.creature import Creature
+from rise_gen.monster_leveler import MonsterLeveler
+
+def _simulate_job_chunk(sides, start, trials, seed):
+    red_names, red_level, blue_names, blue_level = sides
+    return simulate_combat_chunk(
+        sample_group(red_names, red_level, 'red'),
+        sample_group(blue_names, blue_level, 'blue'),
+        start,
+        trials,
+        seed,
+    )
+
+
+class RequestError(Exception):
+    """An error caused by a bad request, reported to the client"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class CombatJob(object):
+    """A combat simulation run in chunks on the service's process pool.
+    A job can be cancelled between chunks."""
+
+    def __init__(self, job_id, sides, trials, seed=None):
+        """
+        Args:
+            job_id (int)
+            sides (tuple): (red names, red level, blue names, blue level)
+            trials (int): number of combats to run
+            seed (varies): seed for reproducible results, as in generate_combat_results
+        """
+        self.id = job_id
+        self.sides = sides
+        self.trials = trials
+        self.seed = seed
+        self.state = 'queued'
+        self.error = None
+        self.totals = None
+        self.completed_trials = 0
+        self.cancelled = False
+        self.finished_at = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self, pool, max_pending_chunks):
+        self.state = 'running'
+        pending = deque()
+        chunks = iter(split_trials(self.trials))
+        try:
+            while True:
+                while not self.cancelled and len(pending) < max_pending_chunks:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append(pool.apply_async(
+                        _simulate_job_chunk,
+                        (self.sides, chunk[0], chunk[1], self.seed),
+                    ))
+                if not pending:
+                    break
+                totals = pending.popleft().get()
+                self.totals = totals if self.totals is None else add_combat_totals(self.totals, totals)
+                self.completed_trials += totals['trials']
+            self.state = 'cancelled' if self.cancelled else 'done'
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = time.monotonic()
+
+    def is_finished(self):
+        return self.finished_at is not None
+
+    def status(self):
+        red_names, red_level, blue_names, blue_level = self.sides
+        return {
+            'id': self.id,
+            'state': self.state,
+            'error': self.error,
+            'red': list(red_names),
+            'red level': red_level,
+            'blue': list(blue_names),
+            'blue level': blue_level,
+            'seed': self.seed,
+            'trials': self.trials,
+            'completed trials': self.completed_trials,
+            'results': summarize_combat_totals(self.totals) if self.totals else None,
+        }
+
+
+class SimulationService(object):
+    """Keeps content, prototype creatures, and a process pool warm between requests.
+    Each worker process keeps the creature groups it builds with combat.sample_group."""
+
+    def __init__(self, workers=None, max_finished_jobs=100, finished_job_seconds=3600):
+        """
+        Args:
+            workers (int): number of worker processes; defaults to the number of CPUs
+            max_finished_jobs (int): most finished jobs to keep; the oldest are forgotten first
+            finished_job_seconds (float): seconds to keep a job after it finishes
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = create_combat_pool(self.workers)
+        self.prototypes = dict()
+        self.jobs = dict()
+        self.job_ids = itertools.count(1)
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_job_seconds = finished_job_seconds
+        self.lock = threading.Lock()
+
+    def prototype(self, name, level):
+        key = (name, level)
+        with self.lock:
+            if key not in self.prototypes:
+                try:
+                    self.prototypes[key] = Creature.from_sample_creature(name, level=level)
+                except Exception as e:
+                    raise RequestError(str(e))
+            return self.prototypes[key]
+
+    def creature(self, name, level):
+        creature = self.prototype(name, level)
+        return {
+            'stat block': creature.stat_block(),
+            'fingerprint': creature.fingerprint(),
+        }
+
+    def level_abilities(self, request):
+        try:
+            abilities = request['abilities']
+            ability_type = request.get('ability type')
+        except (KeyError, TypeError, AttributeError):
+            raise RequestError("Error: expected 'abilities'")
+        return {'results': list(level_abilities(abilities, ability_type))}
+
+    def level_monsters(self, request):
+        try:
+            monsters = request['monsters']
+        except (KeyError, TypeError):
+            raise RequestError("Error: expected 'monsters'")
+        levels = dict()
+        errors = dict()
+        for name in monsters:
+            try:
+                levels[name] = MonsterLeveler.cached_effective_level(name, monsters[name])
+            except Exception as e:
+                errors[name] = str(e)
+        return {'levels': levels, 'errors': errors}
+
+    def submit_job(self, request):
+        try:
+            red_names = request['red']
+            blue_names = request['blue']
+            # a single creature can be given by name
+            red_names = [red_names] if isinstance(red_names, str) else list(red_names)
+            blue_names = [blue_names] if isinstance(blue_names, str) else list(blue_names)
+            level = request.get('level', 1)
+            red_level = request.get('red level', level)
+            blue_level = request.get('blue level', level)
+            trials = int(request.get('trials', 1000))
+        except (KeyError, TypeError, ValueError):
+            raise RequestError("Error: expected 'red', 'blue', and optionally 'trials' and levels")
+        if trials <= 0:
+            raise RequestError("Error: trials must be positive")
+        # fail fast on unknown creatures, and keep the prototypes warm
+        for name in red_names:
+            self.prototype(name, red_level)
+        for name in blue_names:
+            self.prototype(name, blue_level)
+
+        job = CombatJob(
+            next(self.job_ids),
+            (tuple(red_names), red_level, tuple(blue_names), blue_level),
+            trials,
+            request.get('seed'),
+        )
+        with self.lock:
+            self.evict_finished_jobs()
+            self.jobs[job.id] = job
+        threading.Thread(
+            target=job.run,
+            args=(self.pool, self.workers * 2),
+            daemon=True,
+        ).start()
+        return job.status()
+
+    def evict_finished_jobs(self):
+        """Forget finished jobs that have expired, then the oldest finished
+        jobs beyond max_finished_jobs. Must be called with the lock held."""
+        now = time.monotonic()
+        finished = sorted(
+            (job for job in self.jobs.values() if job.is_finished()),
+            key=lambda job: job.finished_at,
+        )
+        expired = [
+            job for job in finished
+            if now - job.finished_at > self.finished_job_seconds
+        ]
+        kept = finished[len(expired):]
+        excess = kept[:max(0, len(kept) - self.max_finished_jobs)]
+        for job in expired + excess:
+            del self.jobs[job.id]
+
+    def list_jobs(self):
+        with self.lock:
+            self.evict_finished_jobs()
+            jobs = list(self.jobs.values())
+        return [job.status() for job in jobs]
+
+    def job(self, job_id):
+        with self.lock:
+            self.evict_finished_jobs()
+            try:
+                return self.jobs[int(job_id)]
+            except (KeyError, ValueError):
+                raise RequestError("Error: unknown job '{0}'".format(job_id), status=404)
+
+    def close(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+        self.pool.terminate()
+        self.pool.join()
+
+
+# Endpoints:
+#   GET    /creatures/<name>?level=<level>   stat block and fingerprint
+#   POST   /levels/abilities                 {"ability type", "abilities": {<name>: <properties>}}
+#   POST   /levels/monsters                  {"monsters": {<name>: <properties>}}
+#   POST   /jobs                             {"red", "blue", "level", "red level", "blue level", "trials", "seed"}
+#   GET    /jobs                             status of every job
+#   GET    /jobs/<id>                        status and progress of a job
+#   DELETE /jobs/<id>                        cancel a job
+#
+# Finished jobs are forgotten once they expire or too many have finished.
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Translates HTTP requests into SimulationService calls.
+    The service is attached to the server as server.service."""
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except ValueError:
+            raise RequestError("Error: request body is not valid JSON")
+
+    def handle_request(self, method):
+        service = self.server.service
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'creatures':
+                query = parse_qs(url.query)
+                level = int(query['level'][0]) if 'level' in query else None
+                self.send_json(200, service.creature(parts[1], level))
+            elif method == 'POST' and parts == ['levels', 'abilities']:
+                self.send_json(200, service.level_abilities(self.read_json()))
+            elif method == 'POST' and parts == ['levels', 'monsters']:
+                self.send_json(200, service.level_monsters(self.read_json()))
+            elif method == 'POST' and parts == ['jobs']:
+                self.send_json(202, service.submit_job(self.read_json()))
+            elif method == 'GET' and parts == ['jobs']:
+                self.send_json(200, service.list_jobs())
+            elif method == 'GET' and len(parts) == 2 and parts[0] == 'jobs':
+                self.send_json(200, service.job(parts[1]).status())
+            elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'jobs':
+                job = service.job(parts[1])
+                job.cancel()
+                self.send_json(200, job.status())
+            else:
+                self.send_json(404, {'error': "Error: unknown endpoint '{0} {1}'".format(method, url.path)})
+        except RequestError as e:
+            self.send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(host='127.0.0.1', port=8765, workers=None, verbose=False,
+                  max_finished_jobs=100, finished_job_seconds=3600):
+    """Create a server with a warm SimulationService. Call serve_forever() to run it.
+
+    Yields:
+        ThreadingHTTPServer: with the service available as server.service
+    """
+    service = SimulationService(workers, max_finished_jobs, finished_job_seconds)
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def initialize_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Serve creature statistics, levelling, and combat simulation over HTTP',
+    )
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        dest='host',
+        help='the address to listen on',
+        type=str,
+    )
+    parser.add_argument(
+        '--finished-job-seconds',
+        default=3600,
+        dest='finished_job_seconds',
+        help='the number of seconds to keep a job after it finishes',
+        type=float,
+    )
+    parser.add_argument(
+        '--max-finished-jobs',
+        default=100,
+        dest='max_finished_jobs',
+        help='the number of finished jobs to keep',
+        type=int,
+    )
+    parser.add_argument(
+        '-p', '--port',
+        default=8765,
+        dest='port',
+        help='the port to listen on',
+        type=int,
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        dest='verbose',
+        help='if true, log every request',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        help='the number of worker processes to run trials in',
+        type=int,
+    )
+    return vars(parser.parse_args())
+
+
+def main(args):
+    server = create_server(
+        args['host'],
+        args['port'],
+        args['workers'],
+        args['verbose'],
+        args['max_finished_jobs'],
+        args['finished_job_seconds'],
+    )
+    print("Serving on http://{0}:{1}".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+if __name__ == "__main__":
+    main(initialize_argument_parser())
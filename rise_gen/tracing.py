@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import json
+from rise_gen.dice import d20
+from rise_gen.util import Patches
+
+# Tracing works like instrumentation: while it is enabled, combat methods are
+# replaced with wrappers that record events, and the originals are restored
+# when it is disabled. Normal trials never pay for tracing.
+
+
+class JsonLinesSink(object):
+    """Writes each event as a line of JSON"""
+
+    def __init__(self, file_name):
+        self.file = open(file_name, 'w')
+
+    def write(self, event):
+        self.file.write(json.dumps(event) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class RingBufferSink(object):
+    """Keeps the most recent events in memory"""
+
+    def __init__(self, size=1000):
+        self.events = deque(maxlen=size)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class Tracer(object):
+    """Records events for the trials it is tracing and sends them to a sink.
+    Trials are numbered from 0 in the order run_combat is called."""
+
+    def __init__(self, sink, trials=None):
+        """
+        Args:
+            sink (JsonLinesSink or RingBufferSink): destination of events
+            trials (iterable): indices of the trials to trace; None to trace all
+        """
+        self.sink = sink
+        self.trials = None if trials is None else set(trials)
+        self.trial = -1
+        self.active = False
+        # damage events of the strike currently being traced
+        self.damage = None
+        self.last_roll = None
+        self.patches = Patches()
+
+    def emit(self, event_type, event):
+        traced_event = {'event': event_type, 'trial': self.trial}
+        traced_event.update(event)
+        self.sink.write(traced_event)
+
+    def install(self, creature_class, combat_module):
+        """Replace combat methods with tracing wrappers
+
+        Args:
+            creature_class (class): the Creature class to trace
+            combat_module (module): the module defining run_combat and
+                CreatureGroup, which may be __main__
+        """
+        tracer = self
+        run_combat = combat_module.run_combat
+        strike = creature_class.strike
+        attack_with_spell = creature_class.attack_with_spell
+        take_damage = creature_class.take_damage
+        group_refresh_round = combat_module.CreatureGroup.refresh_round
+
+        def traced_run_combat(red, blue):
+            tracer.trial += 1
+            tracer.active = tracer.trials is None or tracer.trial in tracer.trials
+            try:
+                results = run_combat(red, blue)
+            finally:
+                active = tracer.active
+                tracer.active = False
+            if active:
+                tracer.emit('trial', dict(results))
+            return results
+
+        def traced_roll():
+            tracer.last_roll = type(d20).roll(d20)
+            return tracer.last_roll
+
+        def traced_take_damage(creature, damage):
+            if not tracer.active:
+                return take_damage(creature, damage)
+            hit_points = creature.current_hit_points
+            take_damage(creature, damage)
+            damage_event = {
+                'damage': damage,
+                'damage taken': hit_points - creature.current_hit_points,
+            }
+            if tracer.damage is not None:
+                tracer.damage.append(damage_event)
+            else:
+                damage_event['target'] = creature.name
+                damage_event['hit points'] = creature.current_hit_points
+                tracer.emit('damage', damage_event)
+
+        def traced_strike(creature, target):
+            if not tracer.active:
+                return strike(creature, target)
+            tracer.damage = list()
+            try:
+                strike(creature, target)
+            finally:
+                damage, tracer.damage = tracer.damage, None
+            roll = tracer.last_roll
+            attack_result = roll + creature.accuracy
+            if roll == 20:
+                attack_result += 10
+            elif roll == 1:
+                attack_result -= 10
+            tracer.emit('strike', {
+                'attacker': creature.name,
+                'target': target.name,
+                'roll': roll,
+                'attack result': attack_result,
+                'defense': target.armor_defense,
+                'hit': bool(damage),
+                'critical': bool(damage) and roll >= creature.critical_threshold,
+                'damage': damage,
+                'hit points': target.current_hit_points,
+            })
+
+        def traced_attack_with_spell(creature, target):
+            if not tracer.active:
+                return attack_with_spell(creature, target)
+            tracer.damage = list()
+            try:
+                attack_with_spell(creature, target)
+            finally:
+                damage, tracer.damage = tracer.damage, None
+            attack_result = tracer.last_roll + creature.accuracy
+            defense = min(target.fortitude, target.mental, target.reflex)
+            if attack_result >= defense + 10:
+                outcome = 'critical'
+            elif attack_result >= defense:
+                outcome = 'hit'
+            else:
+                outcome = 'miss'
+            tracer.emit('spell', {
+                'attacker': creature.name,
+                'target': target.name,
+                'roll': tracer.last_roll,
+                'attack result': attack_result,
+                'defense': defense,
+                'outcome': outcome,
+                'damage': damage,
+                'hit points': target.current_hit_points,
+            })
+
+        def traced_group_refresh_round(group):
+            group_refresh_round(group)
+            if tracer.active:
+                tracer.emit('end of round', {'hit points': [
+                    [creature.name, creature.current_hit_points]
+                    for creature in group.creatures
+                ]})
+
+        self.patches.patch(combat_module, 'run_combat', traced_run_combat)
+        self.patches.patch(d20, 'roll', traced_roll)
+        self.patches.patch(creature_class, 'take_damage', traced_take_damage)
+        self.patches.patch(creature_class, 'strike', traced_strike)
+        self.patches.patch(creature_class, 'attack_with_spell', traced_attack_with_spell)
+        self.patches.patch(combat_module.CreatureGroup, 'refresh_round', traced_group_refresh_round)
+
+    def uninstall(self):
+        self.patches.restore()
+
+
+_tracer = None
+
+
+def enable(sink, creature_class, combat_module, trials=None):
+    """Start tracing combat events
+
+    Args:
+        sink (JsonLinesSink or RingBufferSink): destination of events
+        creature_class (class): the Creature class to trace
+        combat_module (module): the module defining run_combat and CreatureGroup
+        trials (iterable): indices of the trials to trace; None to trace all
+
+    Yields:
+        Tracer
+    """
+    global _tracer
+    disable()
+    _tracer = Tracer(sink, trials)
+    _tracer.install(creature_class, combat_module)
+    return _tracer
+
+
+def disable():
+    """Stop tracing, restore the original methods, and close the sink"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.uninstall()
+        _tracer.sink.close()
+        _tracer = None
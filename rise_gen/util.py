@@ -1,7 +1,62 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
 import yaml
 
+def canonical_key(data):
+    """Return a string that is identical for structurally identical data,
+    regardless of dict ordering
+
+    Args:
+        data (dict, list, or scalar)
+
+    Yields:
+        str
+    """
+    return json.dumps(_canonical_data(data), sort_keys=True, separators=(',', ':'), default=str)
+
+def _canonical_data(data):
+    """Convert dict keys to strings that keep their types distinct,
+    since YAML mappings can mix keys like 1, '1', and None"""
+    if isinstance(data, dict):
+        return {repr(key): _canonical_data(value) for key, value in data.items()}
+    elif isinstance(data, (list, tuple)):
+        return [_canonical_data(value) for value in data]
+    else:
+        return data
+
+def content_hash(data):
+    """Return a stable hash of the structure of the given data
+
+    Args:
+        data (dict, list, or scalar)
+
+    Yields:
+        str: hex digest
+    """
+    return hashlib.sha1(canonical_key(data).encode('utf-8')).hexdigest()
+
+class Patches(object):
+    """Temporarily replaces attributes of classes, modules, or objects,
+    remembering the originals so they can be restored exactly"""
+
+    def __init__(self):
+        # (owner, attribute name, original value in owner.__dict__ or None)
+        self.patches = list()
+
+    def patch(self, owner, name, replacement):
+        self.patches.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, replacement)
+
+    def restore(self):
+        while self.patches:
+            owner, name, original = self.patches.pop()
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
 def import_yaml_file(file_name):
     with open(file_name, 'r') as yaml_file:
         data = yaml.load(yaml_file)
@@ -1,5 +1,5 @@
 from nose.tools import *
-from rise_gen.ability_leveler import AbilityLeveler
+from rise_gen.ability_leveler import AbilityLeveler, calculate_ability_levels, level_abilities
 import rise_gen.util as util
 
 def setup():
@@ -31,3 +31,41 @@ def test_class_feature_levels():
         print(class_feature_name)
         class_feature = AbilityLeveler(class_feature_name, class_features[class_feature_name])
         assert_equal(class_feature.level('class feature'), true_class_feature_levels[class_feature_name])
+
+def test_level_abilities():
+    abilities = {
+        'simple': {
+            'damage': 'normal',
+            'range': 'close',
+        },
+        'invalid': {
+            'range': 'close',
+        },
+    }
+    results = list(level_abilities(abilities, None))
+    assert_equal([result['name'] for result in results], ['simple', 'invalid'])
+    assert_equal(results[0]['level'], 4)
+    assert_equal(results[0]['error'], None)
+    assert_not_equal(results[1]['error'], None)
+    assert_equal(results[1]['error type'], 'Exception')
+    assert_true('Traceback' in results[1]['traceback'])
+
+    try:
+        calculate_ability_levels(abilities, None)
+        assert False, 'expected an exception for an invalid ability'
+    except Exception as e:
+        message = str(e)
+    assert_true(message.startswith("Error: failed to level ability 'invalid': Exception: "))
+    assert_true(results[1]['traceback'] in message)
+
+def test_level_breakdown():
+    ability = AbilityLeveler('simple', {
+        'damage': 'normal',
+        'range': 'close',
+    })
+    breakdown = ability.level('spell', breakdown=True)
+    assert_equal(breakdown.total, ability.level('spell'))
+    assert_equal(
+        [contribution.property_name for contribution in breakdown.contributions][-1],
+        'ability type'
+    )
@@ -27,3 +27,30 @@ def test_ability_prerequisites():
     if a.prerequisite(sc):
         value = a.effects[0](sc, value)
     assert_equals(value, 30)
+
+def test_power_by_name():
+    assert_equal(Ability.power_by_name('fast healing'), Ability.by_name('fast healing').power)
+    # the powers are only collected once
+    powers = Ability.ability_powers
+    Ability.power_by_name('rage')
+    assert_true(Ability.ability_powers is powers)
+    try:
+        Ability.power_by_name('nonexistent')
+        assert False, 'expected an exception for an unknown ability'
+    except Exception as e:
+        assert_equal(str(e), "Error: unable to recognize ability 'nonexistent'")
+
+    # the powers are collected again after they are cleared
+    definitions = Ability.ability_definitions
+    try:
+        Ability.ability_definitions = {
+            'strong trait': {'power': 'strong'},
+            'plain trait': {},
+        }
+        Ability.ability_powers = None
+        assert_equal(Ability.power_by_name('strong trait'), 'strong')
+        assert_equal(Ability.power_by_name('plain trait'), 'average')
+    finally:
+        Ability.ability_definitions = definitions
+        Ability.ability_powers = None
+    assert_equal(Ability.power_by_name('fast healing'), 'average')
@@ -0,0 +1,26 @@
+from nose.tools import *
+from rise_gen.army import Army
+from rise_gen.combat import CreatureGroup
+from rise_gen.creature import Creature
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_army_statistics():
+    fighter = Creature.from_sample_creature('fighter', level=1)
+    army = Army(CreatureGroup([fighter, fighter]))
+    assert_equal(army.hit_points, [10, 10])
+    assert_equal(army.armor_defense, [21, 21])
+
+def test_army_living_index():
+    fighter = Creature.from_sample_creature('fighter', level=1)
+    army = Army(CreatureGroup([fighter, fighter]))
+    army.take_damage(0, 100)
+    assert_equal(army.get_living_index(), 1)
+    army.take_damage(1, 100)
+    assert_equal(army.is_alive(), False)
+    army.refresh_combat()
+    assert_equal(army.get_living_index(), 0)
@@ -0,0 +1,143 @@
+from nose.tools import *
+from rise_gen.balance import (
+    MatchupEvaluator, ability_ablation, ablated_group, perturbed_group,
+    search_level, simulate_matchups, stat_sensitivity
+)
+from rise_gen.combat import sample_group
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_search_level():
+    evaluator = MatchupEvaluator(['fighter'], ['warrior'], 5, seed=1)
+    results = search_level(evaluator, min_level=1, max_level=10, max_trials=2000)
+    assert_equal(results['level'], 5)
+    assert_true(4 < results['interpolated level'] <= 5)
+    assert_true(evaluator.win_rate(4) < 0.5 <= evaluator.win_rate(5))
+
+    # searching again reuses the trials that were already run
+    trials = evaluator.total_trials()
+    assert_equal(search_level(evaluator, min_level=1, max_level=10, max_trials=2000), results)
+    assert_equal(evaluator.total_trials(), trials)
+
+def test_search_level_parallel():
+    serial = MatchupEvaluator(['fighter'], ['warrior'], 5, seed=1)
+    serial_results = search_level(serial, min_level=1, max_level=10, max_trials=2000)
+    evaluator = MatchupEvaluator(['fighter'], ['warrior'], 5, seed=1, workers=2)
+    try:
+        results = search_level(evaluator, min_level=1, max_level=10, max_trials=2000)
+        pool = evaluator.pool
+        search_level(evaluator, min_level=1, max_level=10, max_trials=2000)
+        # the pool is kept for the whole search
+        assert_true(evaluator.pool is pool)
+    finally:
+        evaluator.close()
+    assert_equal(evaluator.pool, None)
+    assert_equal(results['level'], serial_results['level'])
+    # levels simulated in both searches run exactly the same trials
+    for level in serial_results['win rates']:
+        if level in results['win rates']:
+            assert_equal(evaluator.trials(level), serial.trials(level))
+            assert_equal(results['win rates'][level], serial_results['win rates'][level])
+
+def test_search_level_mirror_matchup():
+    evaluator = MatchupEvaluator(['fighter'], ['fighter'], 5, seed=1)
+    results = search_level(evaluator, min_level=1, max_level=10, max_trials=2000)
+    # red and blue are different fighters, so they are evenly matched at the same level
+    assert_true(0.3 < evaluator.win_rate(5) < 0.6)
+    assert_true(abs(results['level offset']) < 1)
+
+def test_search_level_blue():
+    evaluator = MatchupEvaluator(['fighter'], ['warrior'], 5, vary='blue', seed=1)
+    results = search_level(evaluator, target=0.3, min_level=1, max_level=10, max_trials=2000)
+    assert_equal(results['level'], 6)
+    assert_true(results['level offset'] > 0)
+
+def test_search_level_no_crossing():
+    evaluator = MatchupEvaluator(['fighter'], ['warrior'], 5, seed=1)
+    results = search_level(evaluator, min_level=10, max_level=12, max_trials=2000)
+    assert_equal(results['level'], 10)
+    evaluator = MatchupEvaluator(['fighter'], ['warrior'], 10, seed=1)
+    results = search_level(evaluator, min_level=1, max_level=3, max_trials=2000)
+    assert_equal(results['level'], None)
+    assert_equal(results['level offset'], None)
+
+def test_perturbed_group():
+    fighters = sample_group(['fighter'], 1)
+    accuracy = fighters.creatures[0].accuracy
+    perturbed = perturbed_group(fighters, 'accuracy', 2)
+    assert_equal(perturbed.creatures[0].accuracy, accuracy + 2)
+    assert_equal(fighters.creatures[0].accuracy, accuracy)
+    try:
+        perturbed_group(fighters, 'damage_dice', 1)
+        assert False, 'expected an exception for a statistic that is not a number'
+    except Exception as e:
+        assert_equal(str(e), "Error: statistic 'damage_dice' is not a number")
+
+def test_stat_sensitivity():
+    red = sample_group(['fighter'], 5)
+    blue = sample_group(['warrior'], 5)
+    statistics = ['accuracy', 'armor_defense', 'mental']
+    results = stat_sensitivity(red, blue, statistics, trials=1000, seed=1)
+    assert_equal(sorted(row['statistic'] for row in results['statistics']), sorted(statistics))
+    gradients = {row['statistic']: row['gradient'] for row in results['statistics']}
+    assert_true(gradients['accuracy'] > 0)
+    assert_true(gradients['armor_defense'] > 0)
+    # fighters never attack mental defense, so the paired trials are identical
+    assert_equal(gradients['mental'], 0)
+    assert_equal(results['statistics'][-1]['statistic'], 'mental')
+
+    blue_results = stat_sensitivity(red, blue, ['accuracy'], side='blue', trials=1000, seed=1)
+    assert_true(blue_results['statistics'][0]['gradient'] < 0)
+
+def test_stat_sensitivity_mirror_matchup():
+    fighters = sample_group(['fighter'], 5)
+    results = stat_sensitivity(fighters, fighters, ['accuracy'], trials=1000, seed=1)
+    # the fighters do not fight themselves, so the baseline matches two separate groups
+    separate_results = stat_sensitivity(
+        fighters, sample_group(['fighter'], 5, 'blue'), ['accuracy'], trials=1000, seed=1,
+    )
+    assert_equal(results, separate_results)
+    row = results['statistics'][0]
+    assert_true(row['win rate -'] < results['win rate'] < row['win rate +'])
+
+def test_simulate_matchups():
+    red = sample_group(['fighter'], 3)
+    blue = sample_group(['warrior'], 3)
+    other_blue = sample_group(['warrior'], 4)
+    totals = simulate_matchups([(red, blue), (red, other_blue), (red, blue)], 600, seed=2)
+    assert_equal(totals[0], totals[2])
+    assert_equal(totals[0]['trials'], 600)
+    assert_equal(simulate_matchups([(red, blue)], 600, seed=2), totals[:1])
+
+def test_ability_ablation():
+    rogues = sample_group(['rogue'], 5)
+    ablated_rogues = ablated_group(rogues, 'sneak attack')
+    assert_equal([a.name for a in ablated_rogues.creatures[0].abilities], ['magic items', 'size modifiers'])
+    assert_equal(str(ablated_rogues.creatures[0].damage_dice), '1d6')
+    assert_equal(str(rogues.creatures[0].damage_dice), '1d6+3d6')
+    assert_true('sneak attack' in [a.name for a in rogues.creatures[0].abilities])
+    try:
+        ablated_group(rogues, 'rage')
+        assert False, 'expected an exception for a missing ability'
+    except Exception as e:
+        assert_equal(str(e), "Error: no creature has the ability 'rage'")
+
+    results = ability_ablation(sample_group(['ranger'], 5), sample_group(['warrior'], 5), trials=1000, seed=1)
+    abilities = [row['ability'] for row in results['abilities']]
+    assert_equal(sorted(abilities), ['magic items', 'mighty blows', 'quarry', 'size modifiers'])
+    assert_equal(abilities[0], 'quarry')
+    assert_true(results['abilities'][0]['contribution'] > 0)
+
+def test_ability_ablation_mirror_matchup():
+    rogues = sample_group(['rogue'], 5)
+    results = ability_ablation(rogues, rogues, ['sneak attack'], side='blue', trials=1000, seed=1)
+    separate_results = ability_ablation(
+        rogues, sample_group(['rogue'], 5, 'blue'), ['sneak attack'], side='blue', trials=1000, seed=1,
+    )
+    assert_equal(results, separate_results)
+    assert_true(results['win rate'] > 0)
+    assert_true(results['abilities'][0]['contribution'] > 0)
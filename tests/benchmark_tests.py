@@ -0,0 +1,16 @@
+from nose.tools import *
+from rise_gen.benchmark import compare_benchmarks
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_compare_benchmarks():
+    baseline = {'benchmarks': {'die roll': 1.0, 'combat trial': 2.0, 'removed': 1.0}}
+    current = {'benchmarks': {'die roll': 1.05, 'combat trial': 3.0, 'added': 1.0}}
+    assert_equal(compare_benchmarks(baseline, current, 0.1), [
+        ('combat trial', 2.0, 3.0, True),
+        ('die roll', 1.0, 1.05, False),
+    ])
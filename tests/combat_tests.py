@@ -0,0 +1,77 @@
+from nose.tools import *
+from rise_gen.combat import (
+    CreatureGroup, add_combat_totals, generate_combat_results,
+    generate_job_results, sample_group, split_trials, summarize_combat_totals
+)
+from rise_gen.creature import Creature
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_group_living_creature():
+    creatures = [Creature.from_sample_creature('fighter', level=1) for i in range(3)]
+    group = CreatureGroup(creatures)
+    assert_equal(group.get_living_creature(), creatures[0])
+
+    creatures[0].take_damage(100)
+    creatures[1].take_damage(100)
+    assert_equal(group.get_living_creature(), creatures[2])
+
+    creatures[2].take_damage(100)
+    assert_equal(group.get_living_creature(), None)
+    assert_equal(group.is_alive(), False)
+
+    group.refresh_combat()
+    assert_equal(group.get_living_creature(), creatures[0])
+    assert_equal(group.is_alive(), True)
+
+def test_combat_totals():
+    assert_equal(split_trials(1200, 500), [(0, 500), (500, 500), (1000, 200)])
+    totals = add_combat_totals(
+        {'trials': 3, 'red is alive': 2, 'blue is alive': 1, 'rounds': 9},
+        {'trials': 1, 'red is alive': 0, 'blue is alive': 1, 'rounds': 3},
+    )
+    assert_equal(summarize_combat_totals(totals), {
+        'red alive %': 50,
+        'blue alive %': 50,
+        'average rounds': 3.0,
+    })
+
+def test_job_results():
+    defaults = {'level': 1, 'trials': 100, 'seed': None}
+    jobs = [
+        {'red': ['fighter'], 'blue': ['warrior'], 'seed': 1},
+        {'red': ['fighter'], 'blue': ['warrior'], 'seed': 1, 'level': 1},
+        {'red': ['fighter'], 'blue': ['nonexistent']},
+        {'blue': ['warrior']},
+        {'red': 'fighter', 'blue': 'warrior', 'seed': 1},
+        {'red': ['fighter'], 'blue': ['warrior'], 'seed': 1, 'level': 3, 'red level': 1, 'blue level': 1},
+    ]
+    results = sorted(generate_job_results(jobs, defaults), key=lambda result: result['job'])
+    assert_equal([result['job'] for result in results], [0, 1, 2, 3, 4, 5])
+    assert_equal(results[0]['results'], results[1]['results'])
+    # a single name is the same as a list with one name
+    assert_equal(results[4]['red'], ['fighter'])
+    assert_equal(results[4]['results'], results[0]['results'])
+    assert_equal(results[5]['results'], results[0]['results'])
+    assert_equal(results[0]['trials'], 100)
+    assert_true('error' in results[2])
+    assert_equal(results[3]['error'], "Error: job is missing 'red'")
+
+def test_job_results_mirror_matchup():
+    defaults = {'level': 5, 'trials': 1000, 'seed': 1}
+    results = list(generate_job_results([{'red': 'fighter', 'blue': 'fighter'}], defaults))
+    # the red and blue fighters are different creatures
+    assert_true(sample_group(['fighter'], 5, 'red') is not sample_group(['fighter'], 5, 'blue'))
+    expected = generate_combat_results(
+        CreatureGroup([Creature.from_sample_creature('fighter', level=5)]),
+        CreatureGroup([Creature.from_sample_creature('fighter', level=5)]),
+        1000,
+        seed=1,
+    )
+    assert_equal(results[0]['results'], expected)
+    assert_true(expected['red alive %'] > 0)
+    assert_true(expected['blue alive %'] > 0)
@@ -1,4 +1,5 @@
-from nose.tools import assert_equal
+from nose.tools import assert_equal, assert_not_equal, assert_true
+from rise_gen.ability import Ability
 from rise_gen.creature import Creature
 from rise_gen.dice import Die, DieCollection
 import yaml
@@ -86,3 +87,92 @@ def test_all_samples():
         monster = Creature.from_sample_creature(sample_name)
         assert_equal(type(monster), Creature)
         assert_equal(str(monster), test_strings[sample_name].strip())
+
+def test_level_table():
+    c = Creature.from_sample_creature('fighter', level=1)
+    table = c.level_table([1, 10])
+    assert_equal(table[1]['accuracy'], 8)
+    assert_equal(table[10]['accuracy'], 18)
+    assert_equal(table[10]['hit_points'], 160)
+    # the creature itself is never re-levelled
+    assert_equal(c.level, 1)
+    assert_equal(c.hit_points, 10)
+
+    # even if a statistic fails partway through
+    cache = c._cache
+    try:
+        c.level_table([1, 10], ['accuracy', 'nonexistent_statistic'])
+        assert False, 'expected an exception for an unknown statistic'
+    except AttributeError:
+        pass
+    assert_equal(c.level, 1)
+    assert_true(c._cache is cache)
+    assert_equal(c.accuracy, 8)
+
+def test_stat_block():
+    c = Creature.from_sample_creature('fighter', level=1)
+    stat_block = c.stat_block()
+    assert_equal(stat_block['name'], 'fighter')
+    assert_equal(stat_block['armor_defense'], 21)
+    assert_equal(stat_block['damage_dice'], '1d8')
+
+def test_fingerprint():
+    fighter = Creature.from_sample_creature('fighter', level=1)
+    assert_equal(fighter.fingerprint(), Creature.from_sample_creature('fighter', level=1).fingerprint())
+    assert_not_equal(fighter.fingerprint(), Creature.from_sample_creature('fighter', level=2).fingerprint())
+    renamed_fighter = Creature.from_sample_creature('fighter', level=1)
+    renamed_fighter.name = 'renamed fighter'
+    assert_equal(fighter.fingerprint(), renamed_fighter.fingerprint())
+
+def test_fingerprint_end_of_round_effects():
+    # fast healing heals by the creature's level, so the level matters
+    # even when every calculated statistic is the same
+    healing_fighter = Creature.from_sample_creature('fighter_healing', level=5)
+    healing_fighter.combat_statistics()
+    higher_level_fighter = healing_fighter.copy()
+    higher_level_fighter.level = 6
+    assert_not_equal(healing_fighter.fingerprint(), higher_level_fighter.fingerprint())
+    assert_equal(
+        healing_fighter.fingerprint(),
+        Creature.from_sample_creature('fighter_healing', level=5).fingerprint(),
+    )
+    # effects are identified by their definition, not by their bytecode,
+    # so fingerprints are the same in every run
+    assert_equal(
+        healing_fighter.combat_statistics()['end_of_round_effects'],
+        [['AbilityEffect', 'fast healing', 0, ['end of round']]],
+    )
+
+def test_copy():
+    fighter = Creature.from_sample_creature('fighter', level=1)
+    fighter_copy = fighter.copy()
+    assert_equal(fighter_copy.fingerprint(), fighter.fingerprint())
+    fighter_copy.cache('accuracy', fighter.accuracy + 1)
+    fighter_copy.take_damage(1)
+    assert_equal(fighter_copy.accuracy, fighter.accuracy + 1)
+    assert_equal(fighter.current_hit_points, fighter.hit_points)
+
+def test_round_hooks_recompiled():
+    healing_fighter = Creature.from_sample_creature('fighter_healing', level=5)
+    healing_fighter.take_damage(10)
+    healing_fighter.refresh_round()
+    assert_equal(healing_fighter.current_hit_points, healing_fighter.hit_points - 5)
+
+    # removing an ability clears the round hooks compiled from it
+    fighter = healing_fighter.copy()
+    fighter.abilities = [ability for ability in fighter.abilities if ability.name != 'fast healing']
+    fighter.clear_cache()
+    assert_equal(fighter._round_hooks, None)
+    fighter.refresh_combat()
+    assert_equal(fighter._round_hooks, [])
+    fighter.take_damage(10)
+    fighter.refresh_round()
+    assert_equal(fighter.current_hit_points, fighter.hit_points - 10)
+    # the original creature keeps its own hooks
+    assert_equal(len(healing_fighter._round_hooks), 1)
+
+    # adding an ability is picked up by the next combat as well
+    fighter.abilities.append(Ability.by_name('damage reduction'))
+    fighter.clear_cache()
+    fighter.refresh_combat()
+    assert_equal(fighter.available_damage_reduction, 5)
@@ -0,0 +1,82 @@
+from nose.tools import *
+import random
+from rise_gen.combat import exact_training_dummy, simulate_combat
+from rise_gen.creature import Creature
+from rise_gen.damage_model import (
+    attack_profile, combat_rounds_pmf, damage_per_round_table, percentile,
+    round_damage_pmf, strike_outcomes, survival_probabilities
+)
+import rise_gen.distribution as distribution
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def _simulated_round_damage(attacker, defender, trials):
+    total = 0
+    for i in range(trials):
+        defender.refresh_combat()
+        attacker.standard_attack(defender)
+        total += defender.hit_points - defender.current_hit_points
+    defender.refresh_combat()
+    return total / float(trials)
+
+def test_round_damage_pmf():
+    random.seed(1)
+    for attacker_name, defender_name in [
+            ('fighter', 'warrior'), ('barbarian', 'barbarian'), ('sorcerer', 'fighter')]:
+        attacker = Creature.from_sample_creature(attacker_name, level=5)
+        defender = Creature.from_sample_creature(defender_name, level=5)
+        pmf = round_damage_pmf(attacker, defender)
+        assert_almost_equal(sum(pmf.values()), 1)
+        simulated_damage = _simulated_round_damage(attacker, defender, 20000)
+        assert_true(abs(distribution.mean(pmf) - simulated_damage) < 0.5)
+
+def test_round_damage_pmf_cache():
+    fighter = Creature.from_sample_creature('fighter', level=5)
+    renamed_fighter = Creature.from_sample_creature('fighter', level=5)
+    renamed_fighter.name = 'renamed fighter'
+    warrior = Creature.from_sample_creature('warrior', level=5)
+    assert_true(round_damage_pmf(fighter, warrior) is round_damage_pmf(renamed_fighter, warrior))
+    outcomes = strike_outcomes(attack_profile(fighter), warrior.armor_defense)
+    assert_almost_equal(sum(probability for probability, damage_pmfs in outcomes), 1)
+    assert_equal([len(damage_pmfs) for probability, damage_pmfs in outcomes], [0, 2, 2])
+
+def test_damage_per_round_table():
+    table = damage_per_round_table(['fighter', 'sorcerer'], 'dummy', [1, 5])
+    assert_equal(sorted(table.keys()), [1, 5])
+    assert_equal(sorted(table[1].keys()), ['fighter', 'sorcerer'])
+    assert_true(table[5]['fighter'] > table[1]['fighter'])
+
+def test_survival_probabilities():
+    assert_equal(survival_probabilities({20: 1.0}, 10, 3), [1.0, 0, 0, 0])
+    # the zero threshold keeps the creature alive for a round at 0 hit points
+    assert_equal(survival_probabilities({10: 1.0}, 10, 3), [1.0, 1.0, 0, 0])
+    assert_equal(survival_probabilities({5: 1.0}, 10, 4), [1.0, 1.0, 1.0, 0, 0])
+    alive = survival_probabilities({0: 0.5, 10: 0.5}, 10, 2)
+    assert_almost_equal(alive[1], 1.0)
+    assert_almost_equal(alive[2], 0.75)
+    # healing is handled without the list of damage taken
+    assert_equal(survival_probabilities({-5: 1.0}, 10, 2), [1.0, 1.0, 1.0])
+    alive = survival_probabilities({-1: 0.5, 11: 0.5}, 10, 2)
+    assert_almost_equal(alive[1], 0.5)
+    # after healing 1 hit point, 11 damage only reaches 0 hit points
+    assert_almost_equal(alive[2], 0.5)
+
+def test_combat_rounds_pmf():
+    random.seed(1)
+    fighter = Creature.from_sample_creature('fighter', level=5)
+    dummy = Creature.from_sample_creature('dummy', level=5)
+    pmf = combat_rounds_pmf(fighter, dummy)
+    assert_almost_equal(sum(pmf.values()), 1)
+    totals = simulate_combat(fighter, dummy, 2000)
+    assert_true(abs(distribution.mean(pmf) - totals['rounds'] / 2000.0) < 0.5)
+    assert_true(percentile(pmf, 0.1) <= percentile(pmf, 0.5) <= percentile(pmf, 0.9))
+
+def test_exact_training_dummy():
+    results, errors = exact_training_dummy([20])
+    assert_true('wizard' in errors)
+    assert_equal(list(results['fighter'].keys()), [20])
+    assert_almost_equal(sum(results['fighter'][20].values()), 1)
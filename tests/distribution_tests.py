@@ -0,0 +1,31 @@
+from nose.tools import *
+import random
+from rise_gen.dice import Die, DieCollection
+import rise_gen.distribution as distribution
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_dice_pmf():
+    pmf = distribution.dice_pmf(DieCollection(Die(6, 2)))
+    assert_equal(sorted(pmf.keys()), list(range(2, 13)))
+    assert_almost_equal(pmf[7], 6 / 36.0)
+    assert_almost_equal(distribution.mean(pmf), 7)
+
+def test_convolve_power():
+    single_die = distribution.die_pmf(4)
+    pmf = distribution.convolve_power(single_die, 3)
+    assert_almost_equal(sum(pmf.values()), 1)
+    assert_almost_equal(distribution.mean(pmf), 7.5)
+
+def test_dice_sampler():
+    random.seed(1)
+    dice = DieCollection(Die(6, 32))
+    sampler = distribution.dice_sampler(dice)
+    assert_true(distribution.dice_sampler(DieCollection(Die(6, 32))) is sampler)
+    samples = [sampler.sample() for i in range(5000)]
+    assert_true(32 <= min(samples) and max(samples) <= 192)
+    assert_true(abs(sum(samples) / 5000.0 - 112) < 1)
@@ -0,0 +1,31 @@
+from nose.tools import *
+from rise_gen.creature import Creature
+from rise_gen.dice import Die
+import rise_gen.instrumentation as instrumentation
+
+def setup():
+    pass
+
+def teardown():
+    instrumentation.disable()
+    instrumentation.reset()
+
+def test_instrumentation():
+    original_roll = Die.roll
+    creature = Creature.from_sample_creature('fighter', level=1)
+    instrumentation.enable(Creature)
+    creature.clear_cache()
+    creature.accuracy
+    creature.accuracy
+    Die(6).roll()
+    assert_equal(instrumentation.property_accesses['accuracy'], 2)
+    assert_equal(instrumentation.property_misses['accuracy'], 1)
+    assert_true(instrumentation.effect_scans['accuracy'] >= 1)
+    assert_equal(instrumentation.counts['die rolls'], 1)
+
+    instrumentation.disable()
+    assert_equal(Die.roll, original_roll)
+    assert_false('accuracy' in Creature.__dict__)
+    assert_false('active_effects_with_tag' in Creature.__dict__)
+    creature.accuracy
+    assert_equal(instrumentation.property_accesses['accuracy'], 2)
@@ -0,0 +1,35 @@
+from nose.tools import *
+from rise_gen.level_cache import LevelCache, incremental_levels
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_incremental_levels():
+    levelled = list()
+    def level_entries(entries):
+        levelled.extend(sorted(entries))
+        return {name: entries[name]['level'] for name in entries}
+
+    cache = LevelCache()
+    entries = {
+        'a': {'level': 1},
+        'b': {'level': 2},
+    }
+    diffs = incremental_levels(entries, cache, level_entries)
+    assert_equal(diffs, [('a', None, 1), ('b', None, 2)])
+
+    # only changed entries are levelled again
+    del levelled[:]
+    entries = {
+        'a': {'level': 1},
+        'b': {'level': 3},
+    }
+    diffs = incremental_levels(entries, cache, level_entries)
+    assert_equal(levelled, ['b'])
+    assert_equal(diffs, [('b', 2, 3)])
+
+    diffs = incremental_levels({'a': {'level': 1}}, cache, level_entries)
+    assert_equal(diffs, [('b', 3, None)])
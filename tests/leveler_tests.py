@@ -0,0 +1,86 @@
+from nose.tools import *
+from rise_gen.ability_leveler import AbilityLeveler
+from rise_gen.leveler import Leveler, LevelBreakdown
+from rise_gen.monster_leveler import MonsterLeveler
+import rise_gen.util as util
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def scanned_level(leveler):
+    """Level a leveler by looking up each modifier function by name,
+    as Leveler.level did before the dispatch table was compiled"""
+    level = 0
+    for property_name in leveler.properties:
+        if (property_name not in type(leveler).meta_properties
+                and leveler.properties[property_name] is not None):
+            level += getattr(leveler, leveler.modifier_function_name(property_name))()
+    return level
+
+def test_modifier_dispatch():
+    for leveler_class in [AbilityLeveler, MonsterLeveler]:
+        for property_name, modifier_function in leveler_class.modifier_functions.items():
+            assert_true(property_name in leveler_class.possible_properties)
+            assert_equal(
+                modifier_function,
+                getattr(leveler_class, leveler_class.modifier_function_name(property_name)),
+            )
+
+    spells = util.import_yaml_file('content/spells.yaml')
+    for spell_name in spells:
+        spell = AbilityLeveler(spell_name, spells[spell_name])
+        assert_equal(Leveler.level(spell), scanned_level(spell))
+    monster = MonsterLeveler('simple', {'weapons': ['bite', 'claw']})
+    assert_equal(monster.level(), scanned_level(monster))
+
+def test_unknown_modifier():
+    ability = AbilityLeveler('unknown', {
+        'damage': 'normal',
+        'range': 'close',
+        'nonexistent property': 1,
+    })
+    assert_true('nonexistent property' not in AbilityLeveler.modifier_functions)
+    try:
+        ability.validate()
+        assert False, 'expected an exception for an unknown property'
+    except Exception as e:
+        assert_true("has unknown property 'nonexistent property'" in str(e))
+    for level_function in [ability.level, lambda: ability.get_modifier('nonexistent property')]:
+        try:
+            level_function()
+            assert False, 'expected an exception for an unknown modifier'
+        except AttributeError as e:
+            assert_true('_nonexistent_property_modifier' in str(e))
+
+def test_nested_levels():
+    Leveler.clear_nested_levels()
+    try:
+        ability = AbilityLeveler('ordered', {'subeffects': [
+            {'damage': 'normal', 'range': 'close'},
+        ]})
+        reordered_ability = AbilityLeveler('reordered', {'subeffects': [
+            {'range': 'close', 'damage': 'normal'},
+        ]})
+        level = ability.level()
+        assert_equal(reordered_ability.level(), level)
+        # structurally identical subeffects share one memoized breakdown
+        assert_equal(len(Leveler._nested_breakdowns), 1)
+        nested = ability.level(breakdown=True).contributions[0].nested
+        reordered_nested = reordered_ability.level(breakdown=True).contributions[0].nested
+        assert_true(nested[0] is reordered_nested[0])
+
+        # the memoized breakdown is used instead of levelling the subeffect again
+        key = list(Leveler._nested_breakdowns)[0]
+        stale_breakdown = LevelBreakdown()
+        stale_breakdown.add('damage', 100)
+        Leveler._nested_breakdowns[key] = stale_breakdown
+        assert_equal(ability.level(), level - nested[0].total + 100)
+
+        Leveler.clear_nested_levels()
+        assert_equal(Leveler._nested_breakdowns, dict())
+        assert_equal(ability.level(), level)
+    finally:
+        Leveler.clear_nested_levels()
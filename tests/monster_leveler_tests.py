@@ -1,5 +1,5 @@
 from nose.tools import *
-from rise_gen.monster_leveler import MonsterLeveler
+from rise_gen.monster_leveler import MonsterLeveler, calculate_monster_levels
 import rise_gen.util as util
 
 def setup():
@@ -21,3 +21,42 @@ def test_monster_levels():
         print(monster_name)
         monster = MonsterLeveler(monster_name, monsters[monster_name])
         assert_equal(monster.level(), true_monster_levels[monster_name])
+
+def test_cached_effective_level():
+    MonsterLeveler.effective_levels.clear()
+    try:
+        properties = {'weapons': ['bite', 'claw']}
+        assert_equal(MonsterLeveler.cached_effective_level('simple', properties), 0.5)
+        assert_equal(properties, {'weapons': ['bite', 'claw']})
+        assert_equal(list(MonsterLeveler.effective_levels.values()), [0.5])
+
+        # monsters with the same properties share a cached level, whatever their name
+        MonsterLeveler.effective_levels[util.content_hash(properties)] = 'cached'
+        assert_equal(MonsterLeveler.cached_effective_level('renamed', {'weapons': ['bite', 'claw']}), 'cached')
+
+        # changing the properties changes the key, so the monster is levelled again
+        assert_equal(MonsterLeveler.cached_effective_level('simple', {'weapons': ['bite']}), 0.25)
+        assert_equal(len(MonsterLeveler.effective_levels), 2)
+
+        assert_equal(
+            MonsterLeveler.effective_level_by_monster_name('allip'),
+            MonsterLeveler.from_monster_name('allip').effective_level(),
+        )
+    finally:
+        MonsterLeveler.effective_levels.clear()
+
+def test_calculate_monster_levels_in_parallel():
+    monsters = util.import_yaml_file('content/monsters.yaml')
+    data = {name: monsters[name] for name in ['allip', 'arkite_caster', 'planetar', 'troll_mech']}
+    MonsterLeveler.effective_levels.clear()
+    try:
+        levels = calculate_monster_levels(data)
+        MonsterLeveler.effective_levels.clear()
+        assert_equal(calculate_monster_levels(data, workers=2), levels)
+        # the workers' results are cached in this process as well
+        assert_equal(
+            MonsterLeveler.effective_levels,
+            {util.content_hash(data[name]): levels[name] for name in data},
+        )
+    finally:
+        MonsterLeveler.effective_levels.clear()
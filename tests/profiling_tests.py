@@ -0,0 +1,38 @@
+from nose.tools import *
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import rise_gen.instrumentation as instrumentation
+from rise_gen.profiling import profiling
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_profiling():
+    temp_dir = tempfile.mkdtemp()
+    prefix = os.path.join(temp_dir, 'profile')
+    with profiling(prefix, interval=0.001) as profiler:
+        with instrumentation.phase('construction'):
+            busy_wait(0.05)
+        with instrumentation.phase('simulation'):
+            busy_wait(0.05)
+    assert_equal(instrumentation._phase_listeners, [])
+
+    stats = pstats.Stats(prefix + '.simulation.pstats')
+    assert_true(any(function[2] == 'busy_wait' for function in stats.stats))
+    with open(prefix + '.construction.folded') as folded_file:
+        lines = folded_file.read().splitlines()
+    assert_true(lines)
+    assert_true(any('busy_wait' in line for line in lines))
+    assert_true(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+    shutil.rmtree(temp_dir)
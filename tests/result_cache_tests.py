@@ -0,0 +1,48 @@
+from nose.tools import *
+import os
+import shutil
+import tempfile
+from rise_gen.combat import CreatureGroup, generate_combat_results
+from rise_gen.creature import Creature
+import rise_gen.instrumentation as instrumentation
+from rise_gen.result_cache import ResultCache
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def test_result_cache():
+    temp_dir = tempfile.mkdtemp()
+    cache = ResultCache(os.path.join(temp_dir, 'results.sqlite'))
+    red = CreatureGroup([Creature.from_sample_creature('fighter', level=1)])
+    blue = CreatureGroup([Creature.from_sample_creature('warrior', level=1)])
+    key = cache.key(red, blue, 3, 500)
+
+    results = generate_combat_results(red, blue, 600, seed=3, cache=cache)
+    assert_equal(sorted(cache.get_chunks(key)), [(0, 500), (500, 100)])
+    assert_equal(generate_combat_results(red, blue, 600, seed=3), results)
+    assert_equal(generate_combat_results(red, blue, 600, seed=3, cache=cache), results)
+
+    # topping up only runs the trials that were never run, continuing
+    # the chunk that was cut short from its stored random state
+    instrumentation.enable(Creature)
+    try:
+        topped_up_results = generate_combat_results(red, blue, 1100, seed=3, cache=cache)
+        assert_equal(instrumentation.counts['trials'], 500)
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    assert_equal(sorted(cache.get_chunks(key)), [(0, 500), (500, 100), (500, 500), (1000, 100)])
+    assert_equal(generate_combat_results(red, blue, 1100, seed=3), topped_up_results)
+    assert_equal(generate_combat_results(red, blue, 1100, seed=3, cache=cache, workers=2), topped_up_results)
+
+    # continuing in worker processes gives the same results
+    parallel_cache = ResultCache(os.path.join(temp_dir, 'parallel_results.sqlite'))
+    generate_combat_results(red, blue, 600, seed=3, cache=parallel_cache)
+    assert_equal(generate_combat_results(red, blue, 1100, seed=3, cache=parallel_cache, workers=2), topped_up_results)
+    parallel_cache.close()
+
+    cache.close()
+    shutil.rmtree(temp_dir)
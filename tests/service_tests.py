@@ -0,0 +1,124 @@
+from nose.tools import *
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from rise_gen.service import create_server
+
+def setup():
+    pass
+
+def teardown():
+    pass
+
+def request(server, method, path, data=None):
+    url = 'http://{0}:{1}{2}'.format(server.server_address[0], server.server_address[1], path)
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    with urlopen(Request(url, data=body, method=method)) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def test_service():
+    server = create_server(port=0, workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        creature = request(server, 'GET', '/creatures/fighter?level=1')
+        assert_equal(creature['stat block']['armor_defense'], 21)
+
+        job = request(server, 'POST', '/jobs', {
+            'red': ['fighter'],
+            'blue': ['warrior'],
+            'trials': 600,
+            'seed': 1,
+        })
+        for i in range(100):
+            status = request(server, 'GET', '/jobs/{0}'.format(job['id']))
+            if status['state'] != 'running' and status['state'] != 'queued':
+                break
+            time.sleep(0.05)
+        assert_equal(status['state'], 'done')
+        assert_equal(status['completed trials'], 600)
+        assert_true(status['results']['red alive %'] >= 0)
+
+        status = request(server, 'DELETE', '/jobs/{0}'.format(job['id']))
+        assert_equal(status['state'], 'done')
+
+        try:
+            request(server, 'GET', '/creatures/nonexistent')
+            assert False, 'expected an error'
+        except HTTPError as e:
+            assert_equal(e.code, 400)
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+def wait_for_job(server, job_id):
+    for i in range(100):
+        status = request(server, 'GET', '/jobs/{0}'.format(job_id))
+        if status['state'] != 'running' and status['state'] != 'queued':
+            return status
+        time.sleep(0.05)
+    return status
+
+def test_service_finished_jobs():
+    server = create_server(port=0, workers=1, max_finished_jobs=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        first = request(server, 'POST', '/jobs', {
+            'red': 'fighter',
+            'blue': 'warrior',
+            'red level': 2,
+            'trials': 100,
+            'seed': 1,
+        })
+        assert_equal(first['red'], ['fighter'])
+        assert_equal(first['red level'], 2)
+        assert_equal(first['blue level'], 1)
+        assert_equal(wait_for_job(server, first['id'])['state'], 'done')
+
+        second = request(server, 'POST', '/jobs', {
+            'red': ['fighter'],
+            'blue': ['warrior'],
+            'trials': 100,
+            'seed': 1,
+        })
+        assert_equal(wait_for_job(server, second['id'])['state'], 'done')
+
+        # only the most recently finished job is kept
+        assert_equal([job['id'] for job in request(server, 'GET', '/jobs')], [second['id']])
+        try:
+            request(server, 'GET', '/jobs/{0}'.format(first['id']))
+            assert False, 'expected the first job to be forgotten'
+        except HTTPError as e:
+            assert_equal(e.code, 404)
+
+        # expired jobs are forgotten as well
+        server.service.finished_job_seconds = 0
+        time.sleep(0.01)
+        assert_equal(request(server, 'GET', '/jobs'), [])
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+def test_service_mirror_matchup():
+    server = create_server(port=0, workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        job = request(server, 'POST', '/jobs', {
+            'red': 'fighter',
+            'blue': 'fighter',
+            'level': 5,
+            'trials': 1000,
+            'seed': 1,
+        })
+        status = wait_for_job(server, job['id'])
+        assert_equal(status['state'], 'done')
+        # red and blue are different fighters, so neither side always loses
+        assert_true(status['results']['red alive %'] > 0)
+        assert_true(status['results']['blue alive %'] > 0)
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
@@ -0,0 +1,41 @@
+from nose.tools import *
+import rise_gen.combat as combat
+from rise_gen.combat import CreatureGroup
+from rise_gen.creature import Creature
+import rise_gen.tracing as tracing
+
+def setup():
+    pass
+
+def teardown():
+    tracing.disable()
+
+def test_tracing():
+    original_strike = Creature.strike
+    red = CreatureGroup([Creature.from_sample_creature('fighter', level=1)])
+    blue = CreatureGroup([Creature.from_sample_creature('sorcerer', level=1)])
+    sink = tracing.RingBufferSink(size=10000)
+    tracing.enable(sink, Creature, combat, trials=[1])
+    combat.simulate_combat(red, blue, 3)
+    tracing.disable()
+
+    events = list(sink.events)
+    assert_true(events)
+    assert_equal(set(event['trial'] for event in events), set([1]))
+    assert_equal(events[-1]['event'], 'trial')
+    event_types = set(event['event'] for event in events)
+    assert_true('strike' in event_types)
+    assert_true('spell' in event_types)
+    for event in events:
+        if event['event'] == 'strike':
+            assert_equal(event['hit'], len(event['damage']) == 2)
+            assert_equal(event['hit'], event['attack result'] >= event['defense'])
+
+    assert_equal(Creature.strike, original_strike)
+    assert_equal(combat.run_combat.__name__, 'run_combat')
+
+def test_ring_buffer_sink():
+    sink = tracing.RingBufferSink(size=2)
+    for i in range(3):
+        sink.write(i)
+    assert_equal(list(sink.events), [1, 2])